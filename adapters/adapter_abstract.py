@@ -1,13 +1,16 @@
 import logging
 import traceback as tb
 from abc import ABC, abstractmethod
+from adapters.metrics import Metrics
 from collections import namedtuple
+import itertools
 
 
 class AdapterAbstract(ABC):
     def __init__(self):
         super().__init__()
         self.__logger = self.__get_logger()
+        self.metrics = Metrics()
 
     def __enter__(self):
         return self
@@ -17,6 +20,8 @@ class AdapterAbstract(ABC):
 
     def __get_logger(self):
         logger = logging.getLogger(__name__)
+        if logger.handlers:
+            return logger
         logger.setLevel(logging.ERROR)
         ch = logging.StreamHandler()
         ch.setLevel(logging.ERROR)
@@ -34,6 +39,15 @@ class AdapterAbstract(ABC):
     def log_exception(self, exc):
         self.__logger.error(exc)
 
+    def get_identity(self):
+        """ Identifies the data source, e.g. for caching query results"""
+        return type(self).__name__
+
+    def has_stable_order(self):
+        """ Whether running a query again yields the rows in the same order,
+        which servers only guarantee for an ORDER BY on a unique key"""
+        return True
+
     @abstractmethod
     def get_result_table(self, *args):
         """ Should return a Table instance"""
@@ -46,5 +60,165 @@ class AdapterAbstract(ABC):
     def delete_table(self, *args):
         """Should delete a table"""
 
+    def append_table(self, table, *args):
+        """ Should append the rows of a Table instance to an existing table"""
+        raise NotImplementedError(
+            f'{type(self).__name__} can not append to a table')
+
+    def get_incremental_table(self, query, column, watermark, ordered=False,
+                              **kwargs):
+        """ Returns the rows of the query result whose column is greater
+        than watermark, all rows if watermark is None. kwargs are passed on
+        to get_result_table.
+
+        ordered sorts the rows by column, NULL first like MySQL. Adapters
+        that can't sort at the source sort the whole result in memory """
+        table = self.get_result_table(query, **kwargs)
+        if watermark is None and not ordered:
+            return table
+        column_index = get_column_index(table.schema, column)
+        row_iter = table.row_iter
+        if watermark is not None:
+            row_iter = (row for row in row_iter
+                        if row[column_index] is not None
+                        and row[column_index] > watermark)
+        if ordered:
+            row_iter = iter(sorted(row_iter, key=lambda row: (
+                row[column_index] is not None, row[column_index])))
+        return Table(table.schema, row_iter)
+
+
+class Table(namedtuple('Table', ['schema', 'row_iter'])):
+    __slots__ = ()
+
+    @classmethod
+    def from_batches(cls, schema, batch_iter):
+        return cls(schema, BatchRowIter(batch_iter))
+
+    def batch_iter(self, batchsize=None):
+        """ Yields batches of batchsize rows as tuples of columns, only the
+        last one can be smaller. Without batchsize the batches of a table
+        from batches are yielded as they are, rows in batches of 1000"""
+        if isinstance(self.row_iter, BatchRowIter):
+            batches = self.row_iter.batch_iter()
+            if batchsize is None:
+                return batches
+            return rebatch(batches, batchsize)
+        return get_batches(self.row_iter, batchsize or 1000)
+
+
+class BatchRowIter:
+    """ Yields the rows of columnar batches, or the remaining batches"""
+
+    def __init__(self, batch_iter):
+        self.__batch_iter = iter(batch_iter)
+        self.__rows = iter(())
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            for row in self.__rows:
+                return row
+            self.__rows = batch_to_rows(next(self.__batch_iter))
+
+    def batch_iter(self):
+        rows = list(self.__rows)
+        if rows:
+            yield rows_to_batch(rows)
+        for batch in self.__batch_iter:
+            if get_batch_length(batch):
+                yield batch
+
+
+def check_append(adapter):
+    """ Raises if adapter can't append, before a destination is created"""
+    if type(adapter).append_table is AdapterAbstract.append_table:
+        raise NotImplementedError(
+            f'{type(adapter).__name__} can not append to a table')
+
+
+def get_column_index(schema, column):
+    column_names = [column_name for column_name, _ in schema]
+    return column_names.index(column)
+
+
+def rows_to_batch(rows):
+    return tuple(map(list, zip(*rows)))
+
+
+def batch_to_rows(batch):
+    return zip(*batch)
+
+
+def get_batch_length(batch):
+    return len(batch[0]) if batch else 0
+
+
+def get_batches(row_iter, batchsize):
+    row_iter = iter(row_iter)
+    while True:
+        rows = list(itertools.islice(row_iter, batchsize))
+        if rows:
+            yield rows_to_batch(rows)
+        else:
+            break
+
+
+def rebatch(batch_iter, batchsize):
+    """ Yields the rows of batch_iter in batches of batchsize rows, merging
+    smaller and splitting larger batches, only the last can be smaller"""
+    buffer = BatchBuffer(batchsize)
+    for batch in batch_iter:
+        yield from buffer.add(batch)
+    yield from buffer.flush()
+
+
+class BatchBuffer:
+    """ Collects batches until they fill batches of batchsize rows"""
+
+    def __init__(self, batchsize):
+        self.__batchsize = batchsize
+        self.__pending = []
+        self.__pending_rows = 0
+
+    def add(self, batch):
+        """ Returns the batches of batchsize rows completed by batch"""
+        length = get_batch_length(batch)
+        if not length:
+            return []
+        start = 0
+        full_batches = []
+        if self.__pending:
+            start = min(self.__batchsize - self.__pending_rows, length)
+            self.__pending.append(slice_batch(batch, 0, start))
+            self.__pending_rows += start
+            if self.__pending_rows < self.__batchsize:
+                return full_batches
+            full_batches.extend(self.flush())
+        while length - start >= self.__batchsize:
+            full_batches.append(
+                slice_batch(batch, start, start + self.__batchsize))
+            start += self.__batchsize
+        if start < length:
+            self.__pending = [slice_batch(batch, start, length)]
+            self.__pending_rows = length - start
+        return full_batches
+
+    def flush(self):
+        """ Returns the pending rows as one batch"""
+        pending, self.__pending = self.__pending, []
+        self.__pending_rows = 0
+        if not pending:
+            return []
+        if len(pending) == 1:
+            return pending
+        return [tuple(list(itertools.chain.from_iterable(columns))
+                      for columns in zip(*pending))]
+
 
-Table = namedtuple('Table', ['schema', 'row_iter'])
+def slice_batch(batch, start, stop):
+    if start == 0 and stop == get_batch_length(batch):
+        return batch
+    return tuple(column[start:stop] for column in batch)
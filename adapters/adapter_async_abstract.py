@@ -0,0 +1,166 @@
+from adapters.adapter_abstract import (AdapterAbstract, BatchBuffer, Table,
+                                       batch_to_rows, get_batch_length,
+                                       rows_to_batch)
+from abc import abstractmethod
+from collections import namedtuple
+import asyncio
+import functools
+
+
+class AsyncAdapterAbstract(AdapterAbstract):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exception):
+        self.__exit__(*exception)
+
+    @abstractmethod
+    async def get_result_table(self, *args):
+        """ Should return an AsyncTable instance"""
+
+    @abstractmethod
+    async def create_table(self, table, *args):
+        """ Should create a table from an AsyncTable instance """
+
+    @abstractmethod
+    async def delete_table(self, *args):
+        """Should delete a table"""
+
+
+class AsyncAdapterExecutor(AsyncAdapterAbstract):
+    """ Runs a synchronous adapter in an executor """
+
+    def __init__(self, adapter, executor=None):
+        super().__init__()
+        self.__adapter = adapter
+        self.__executor = executor
+
+    async def __aenter__(self):
+        await self.__run(self.__adapter.__enter__)
+        return self
+
+    async def __aexit__(self, *exception):
+        await self.__run(self.__adapter.__exit__, *exception)
+
+    async def get_result_table(self, *args, batchsize=1000, **kwargs):
+        table = await self.__run(
+            self.__adapter.get_result_table, *args, **kwargs)
+        batch_iter = self.__iterate(table.batch_iter(batchsize))
+        return AsyncTable.from_batches(table.schema, batch_iter)
+
+    async def create_table(self, table, *args, batchsize=1000, **kwargs):
+        if isinstance(table, AsyncTable):
+            loop = asyncio.get_running_loop()
+            batch_iter = self.__get_sync_iter(
+                table.batch_iter(batchsize), loop)
+            table = Table.from_batches(table.schema, batch_iter)
+        await self.__run(self.__adapter.create_table, table, *args, **kwargs)
+
+    async def delete_table(self, *args, **kwargs):
+        await self.__run(self.__adapter.delete_table, *args, **kwargs)
+
+    async def __run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.__executor, functools.partial(function, *args, **kwargs))
+
+    async def __iterate(self, iterator):
+        while True:
+            item = await self.__run(next, iterator, _DONE)
+            if item is _DONE:
+                break
+            yield item
+
+    def __get_sync_iter(self, async_iter, loop):
+        while True:
+            future = asyncio.run_coroutine_threadsafe(
+                _anext(async_iter), loop)
+            item = future.result()
+            if item is _DONE:
+                break
+            yield item
+
+
+class AsyncTable(namedtuple('AsyncTable', ['schema', 'row_iter'])):
+    __slots__ = ()
+
+    @classmethod
+    def from_batches(cls, schema, batch_iter):
+        return cls(schema, AsyncBatchRowIter(batch_iter))
+
+    def batch_iter(self, batchsize=None):
+        """ Yields batches of batchsize rows as tuples of columns, only the
+        last one can be smaller. Without batchsize the batches of a table
+        from batches are yielded as they are, rows in batches of 1000"""
+        if isinstance(self.row_iter, AsyncBatchRowIter):
+            batches = self.row_iter.batch_iter()
+            if batchsize is None:
+                return batches
+            return rebatch(batches, batchsize)
+        return get_batches(self.row_iter, batchsize or 1000)
+
+
+class AsyncBatchRowIter:
+    """ Yields the rows of columnar batches, or the remaining batches"""
+
+    def __init__(self, batch_iter):
+        self.__batch_iter = batch_iter
+        self.__rows = iter(())
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            for row in self.__rows:
+                return row
+            batch = await self.__batch_iter.__anext__()
+            self.__rows = batch_to_rows(batch)
+
+    async def batch_iter(self):
+        rows = list(self.__rows)
+        if rows:
+            yield rows_to_batch(rows)
+        async for batch in self.__batch_iter:
+            if get_batch_length(batch):
+                yield batch
+
+
+async def get_async_batch_iter(table, batchsize):
+    """ Yields the batches of an AsyncTable or a Table asynchronously"""
+    if isinstance(table, AsyncTable):
+        async for batch in table.batch_iter(batchsize):
+            yield batch
+    else:
+        for batch in table.batch_iter(batchsize):
+            yield batch
+
+
+async def get_batches(row_iter, batchsize):
+    rows = []
+    async for row in row_iter:
+        rows.append(row)
+        if len(rows) == batchsize:
+            yield rows_to_batch(rows)
+            rows = []
+    if rows:
+        yield rows_to_batch(rows)
+
+
+async def rebatch(batch_iter, batchsize):
+    buffer = BatchBuffer(batchsize)
+    async for batch in batch_iter:
+        for full_batch in buffer.add(batch):
+            yield full_batch
+    for batch in buffer.flush():
+        yield batch
+
+
+_DONE = object()
+
+
+async def _anext(async_iter):
+    try:
+        return await async_iter.__anext__()
+    except StopAsyncIteration:
+        return _DONE
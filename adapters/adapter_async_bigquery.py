@@ -0,0 +1,7 @@
+from adapters.adapter_async_abstract import AsyncAdapterExecutor
+from adapters.adapter_bigquery import AdapterBigquery
+
+
+class AsyncAdapterBigquery(AsyncAdapterExecutor):
+    def __init__(self, service_acc, executor=None):
+        super().__init__(AdapterBigquery(service_acc), executor)
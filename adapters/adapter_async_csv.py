@@ -0,0 +1,7 @@
+from adapters.adapter_async_abstract import AsyncAdapterExecutor
+from adapters.adapter_csv import AdapterCsv
+
+
+class AsyncAdapterCsv(AsyncAdapterExecutor):
+    def __init__(self, executor=None):
+        super().__init__(AdapterCsv(), executor)
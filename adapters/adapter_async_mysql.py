@@ -0,0 +1,82 @@
+from adapters.adapter_async_abstract import (AsyncAdapterAbstract, AsyncTable,
+                                             get_async_batch_iter)
+from adapters.adapter_abstract import batch_to_rows, rows_to_batch
+from adapters.adapter_mysql import AdapterMysql
+from adapters.type_mapping import convert_batch
+from pymysql.constants import FIELD_TYPE
+import aiomysql
+
+
+class AsyncAdapterMysql(AsyncAdapterAbstract):
+    CONFIG_TO_AIOMYSQL = {
+        'database': 'db',
+        'allow_local_infile': 'local_infile'
+    }
+
+    FIELD_TYPE_NAMES = {
+        getattr(FIELD_TYPE, name): name
+        for name in AdapterMysql.MYSQL_TO_ADAPTER if hasattr(FIELD_TYPE, name)
+    }
+
+    def __init__(self, db_config):
+        super().__init__()
+        self.__db_config = {self.CONFIG_TO_AIOMYSQL.get(key, key): value
+                            for key, value in db_config.items()}
+
+    async def __aenter__(self):
+        self.__connection = await aiomysql.connect(**self.__db_config)
+        return self
+
+    async def __aexit__(self, *exception):
+        await super().__aexit__(*exception)
+        self.__connection.close()
+
+    async def get_result_table(self, query, fetchsize=1000):
+        cursor = await self.__connection.cursor(aiomysql.SSCursor)
+        await cursor.execute(query)
+        schema = self.__get_table_schema(cursor)
+        plan = AdapterMysql.get_read_plan([
+            self.FIELD_TYPE_NAMES[column[1]] for column in cursor.description])
+        batch_iter = self.__get_batch_iter(cursor, fetchsize, plan)
+        return AsyncTable.from_batches(schema, batch_iter)
+
+    def __get_table_schema(self, cursor):
+        column_names = [column[0] for column in cursor.description]
+        column_types = [AdapterMysql.MYSQL_TO_ADAPTER[
+            self.FIELD_TYPE_NAMES[column[1]]] for column in cursor.description]
+        return list(zip(column_names, column_types))
+
+    async def __get_batch_iter(self, cursor, fetchsize, plan):
+        try:
+            while True:
+                rows = await cursor.fetchmany(fetchsize)
+                if rows:
+                    yield convert_batch(rows_to_batch(rows), plan)
+                else:
+                    break
+        finally:
+            await cursor.close()
+
+    async def create_table(self, table, table_adress, chunksize=1000):
+        async with self.__connection.cursor() as cursor:
+            await cursor.execute(
+                self.__get_create_query(table.schema, table_adress))
+            query = self.__get_insert_query(table.schema, table_adress)
+            async for batch in get_async_batch_iter(table, chunksize):
+                await cursor.executemany(query, list(batch_to_rows(batch)))
+        await self.__connection.commit()
+
+    def __get_create_query(self, table_schema, table_name):
+        mysql_types = AdapterMysql.ADAPTER_TO_MYSQL
+        columns = ', '.join(
+            f'{column_name} {mysql_types.get(column_type, "TEXT")}'
+            for column_name, column_type in table_schema)
+        return f'CREATE TABLE {table_name} ({columns})'
+
+    def __get_insert_query(self, table_schema, table_name):
+        placeholders = ', '.join(['%s'] * len(table_schema))
+        return f'INSERT INTO {table_name} VALUES ({placeholders})'
+
+    async def delete_table(self, table_adress):
+        async with self.__connection.cursor() as cursor:
+            await cursor.execute(f'DROP TABLE {table_adress}')
@@ -1,6 +1,16 @@
-from adapters.adapter_abstract import AdapterAbstract, Table
-from google.cloud import bigquery
-import itertools
+from adapters.adapter_abstract import (AdapterAbstract, Table, batch_to_rows,
+                                       rows_to_batch)
+from adapters.streams import fan_in
+from adapters.type_mapping import convert_row, get_arrow_type
+from concurrent.futures import (ThreadPoolExecutor, wait, ALL_COMPLETED,
+                                FIRST_COMPLETED)
+import datetime
+import decimal
+import gzip
+import io
+import json
+import os
+import threading
 
 
 class AdapterBigquery(AdapterAbstract):
@@ -11,26 +21,114 @@ class AdapterBigquery(AdapterAbstract):
         'INT64': 'INTEGER',
         'FLOAT': 'FLOAT',
         'FLOAT64': 'FLOAT',
-        'BOOLEAN': 'STRING',
-        'BOOL': 'STRING',
-        'TIMESTAMP': 'STRING',
-        'DATE': 'STRING',
-        'TIME': 'STRING',
-        'DATETIME': 'STRING',
+        'BOOLEAN': 'BOOLEAN',
+        'BOOL': 'BOOLEAN',
+        'NUMERIC': 'NUMERIC',
+        'BIGNUMERIC': 'NUMERIC',
+        'TIMESTAMP': 'TIMESTAMP',
+        'DATE': 'DATE',
+        'TIME': 'TIME',
+        'DATETIME': 'DATETIME',
         'RECORD': 'STRING',
         'STRUCT': 'STRING'
     }
 
+    ADAPTER_TO_AVRO = {
+        'STRING': 'string',
+        'INTEGER': 'long',
+        'FLOAT': 'double',
+        'BOOLEAN': 'boolean',
+        'NUMERIC': {'type': 'bytes', 'logicalType': 'decimal',
+                    'precision': 38, 'scale': 9},
+        'DATE': {'type': 'int', 'logicalType': 'date'},
+        'DATETIME': {'type': 'string', 'logicalType': 'datetime'},
+        'TIMESTAMP': {'type': 'long', 'logicalType': 'timestamp-micros'},
+        'TIME': {'type': 'long', 'logicalType': 'time-micros'}
+    }
+
+    __clients = {}
+    __clients_lock = threading.Lock()
+
     def __init__(self, service_acc):
         super().__init__()
-        self.__client = bigquery.Client.from_service_account_json(service_acc)
+        self.__service_acc = os.path.abspath(service_acc)
+
+    @classmethod
+    def clear_clients(cls):
+        with cls.__clients_lock:
+            cls.__clients.clear()
+
+    @property
+    def __client(self):
+        return self.__get_cached_client('bigquery', self.__create_client)
+
+    def __get_cached_client(self, kind, create_client):
+        key = (kind, self.__service_acc)
+        client = self.__clients.get(key)
+        if client is None:
+            with self.__clients_lock:
+                client = self.__clients.get(key)
+                if client is None:
+                    client = create_client()
+                    self.__clients[key] = client
+        return client
+
+    def __create_client(self):
+        from google.cloud import bigquery
+        return bigquery.Client.from_service_account_json(self.__service_acc)
+
+    def __create_read_client(self):
+        from google.cloud import bigquery_storage
+        return bigquery_storage.BigQueryReadClient.from_service_account_json(
+            self.__service_acc)
 
-    def get_result_table(self, query):
-        query_job = self.__client.query(query)
-        query_result = query_job.result()
+    def get_identity(self):
+        return f'{type(self).__name__}[{self.__service_acc}]'
+
+    def has_stable_order(self):
+        return False
+
+    def get_result_table(self, query, read_streams=None, prefetch=4,
+                         ordered=True, params=None):
+        job_config = self.__get_query_job_config(params)
+        with self.metrics.timer('query'):
+            query_job = self.__client.query(query, job_config=job_config)
+            query_result = query_job.result()
+        self.metrics.record('round_trips')
         schema = self.__get_table_schema(query_result)
-        row_iter = self.__get_row_iter(query_result)
-        return Table(schema, row_iter)
+        if read_streams:
+            batch_iter = self.__get_parallel_batch_iter(
+                query_job.destination, read_streams, prefetch, ordered)
+        else:
+            batch_iter = self.__get_batch_iter(query_result)
+        batch_iter = self.metrics.timed(batch_iter, 'fetch')
+        return Table.from_batches(
+            schema, self.metrics.counted(batch_iter, 'rows_read'))
+
+    def __get_query_job_config(self, params):
+        if not params:
+            return None
+        from google.cloud import bigquery
+        query_parameters = [
+            bigquery.ScalarQueryParameter(
+                name, self.__get_parameter_type(value), value)
+            for name, value in params.items()]
+        return bigquery.QueryJobConfig(query_parameters=query_parameters)
+
+    def __get_parameter_type(self, value):
+        if isinstance(value, bool):
+            return 'BOOL'
+        if isinstance(value, int):
+            return 'INT64'
+        if isinstance(value, float):
+            return 'FLOAT64'
+        if isinstance(value, decimal.Decimal):
+            return 'NUMERIC'
+        if isinstance(value, datetime.datetime):
+            return 'TIMESTAMP' if value.tzinfo else 'DATETIME'
+        if isinstance(value, datetime.date):
+            return 'DATE'
+        return 'STRING'
 
     def __get_table_schema(self, query_result):
         column_names = [column.name for column in query_result.schema]
@@ -44,14 +142,83 @@ class AdapterBigquery(AdapterAbstract):
                              for datatype in datatypes]
         return adapter_datatypes
 
-    def __get_row_iter(self, query_result):
-        for row in query_result:
-            yield row.values()
+    def __get_batch_iter(self, query_result):
+        for page in query_result.pages:
+            yield rows_to_batch(row.values() for row in page)
+
+    def __get_parallel_batch_iter(self, table_ref, read_streams, prefetch,
+                                ordered):
+        read_client = self.__get_read_client()
+        session = self.__create_read_session(
+            read_client, table_ref, read_streams)
+        streams = [self.__get_stream_reader(read_client, session, stream.name)
+                   for stream in session.streams]
+        return fan_in(streams, len(streams) or 1, prefetch, ordered)
+
+    def __get_read_client(self):
+        return self.__get_cached_client('read', self.__create_read_client)
+
+    def __create_read_session(self, read_client, table_ref, read_streams):
+        from google.cloud.bigquery_storage import types
+        table_path = (f'projects/{table_ref.project}/datasets/'
+                      f'{table_ref.dataset_id}/tables/{table_ref.table_id}')
+        requested_session = types.ReadSession(
+            table=table_path, data_format=types.DataFormat.AVRO)
+        return read_client.create_read_session(
+            parent=f'projects/{table_ref.project}',
+            read_session=requested_session, max_stream_count=read_streams)
 
-    def create_table(self, table, table_adress):
+    def __get_stream_reader(self, read_client, session, stream_name):
+        def read_stream():
+            reader = read_client.read_rows(stream_name)
+            for page in reader.rows(session).pages:
+                yield rows_to_batch(row.values() for row in page)
+        return read_stream
+
+    def get_incremental_table(self, query, column, watermark, ordered=False,
+                              **kwargs):
+        query = f'SELECT * FROM ({query}) AS incremental'
+        params = None
+        if watermark is not None:
+            query += f' WHERE {column} > @watermark'
+            params = {'watermark': watermark}
+        if ordered:
+            query += f' ORDER BY {column}'
+        return self.get_result_table(query, params=params, **kwargs)
+
+    def create_table(self, table, table_adress, **kwargs):
         table_ref = self.__get_table_ref_from_adress(table_adress)
         table_bq = self.__create_empty_table(table_ref, table.schema)
-        self.__insert_data_in_table(table_bq, table.row_iter)
+        self.__write_data_in_table(table_bq, table, **kwargs)
+
+    def append_table(self, table, table_adress, **kwargs):
+        table_ref = self.__get_table_ref_from_adress(table_adress)
+        table_bq = self.__client.get_table(table_ref)
+        self.__write_data_in_table(table_bq, table, **kwargs)
+
+    def load_file(self, file_name, table_adress, source_format='PARQUET'):
+        """ Appends a local file, e.g. written by AdapterParquet, to the
+        table with one load job without reading it """
+        from google.cloud import bigquery
+        table_ref = self.__get_table_ref_from_adress(table_adress)
+        job_config = bigquery.LoadJobConfig(
+            source_format=source_format, write_disposition='WRITE_APPEND')
+        with open(file_name, 'rb') as file_obj:
+            with self.metrics.timer('write'):
+                load_job = self.__client.load_table_from_file(
+                    file_obj, table_ref, job_config=job_config)
+                load_job.result()
+        self.metrics.record('round_trips')
+        self.metrics.record('bytes_written', os.path.getsize(file_name))
+
+    def __write_data_in_table(self, table_bq, table, load_job=False,
+                              source_format='NEWLINE_DELIMITED_JSON',
+                              load_chunksize=500000, max_workers=4):
+        if load_job:
+            self.__load_data_in_table(table_bq, table, source_format,
+                                      load_chunksize, max_workers)
+        else:
+            self.__insert_data_in_table(table_bq, table)
 
     def __get_table_ref_from_adress(self, table_adress):
         dataset_id, table_id = table_adress.split('.')
@@ -60,25 +227,109 @@ class AdapterBigquery(AdapterAbstract):
         return table_ref
 
     def __create_empty_table(self, table_ref, table_schema):
+        from google.cloud import bigquery
         schema = [bigquery.SchemaField(*column_schema)
                   for column_schema in table_schema]
         table_bq = bigquery.Table(table_ref, schema=schema)
         table_bq = self.__client.create_table(table_bq)
         return table_bq
 
-    def __insert_data_in_table(self, table_ref, row_iter, chunksize=1000):
-        while True:
-            rows = list(itertools.islice(row_iter, chunksize))
-            if rows:
-                self.__insert_rows(table_ref, rows)
-            else:
-                break
+    def __insert_data_in_table(self, table_ref, table, chunksize=1000):
+        for batch in table.batch_iter(chunksize):
+            self.__insert_rows(table_ref, list(batch_to_rows(batch)))
 
     def __insert_rows(self, table_ref, rows):
-        errors = self.__client.insert_rows(table_ref, rows)
+        with self.metrics.timer('write'):
+            errors = self.__client.insert_rows(table_ref, rows)
+        self.metrics.record('round_trips')
+        self.metrics.record('rows_written', len(rows))
         if errors:
             self.log_exception(errors)
 
+    def __load_data_in_table(self, table_bq, table, source_format,
+                             chunksize, max_workers):
+        from google.cloud import bigquery
+        serialize = self.__get_serializer(source_format)
+        job_config = bigquery.LoadJobConfig(
+            source_format=source_format, schema=table_bq.schema,
+            write_disposition='WRITE_APPEND',
+            use_avro_logical_types=source_format == 'AVRO')
+        with ThreadPoolExecutor(max_workers) as executor:
+            pending = set()
+            for batch in table.batch_iter(chunksize):
+                rows = list(batch_to_rows(batch))
+                if len(pending) >= max_workers:
+                    pending = self.__wait_for_load_jobs(pending, FIRST_COMPLETED)
+                pending.add(executor.submit(
+                    self.__load_rows, table_bq, table.schema, rows,
+                    serialize, job_config))
+            self.__wait_for_load_jobs(pending)
+
+    def __wait_for_load_jobs(self, pending, return_when=ALL_COMPLETED):
+        done, pending = wait(pending, return_when=return_when)
+        for future in done:
+            future.result()
+        return pending
+
+    def __load_rows(self, table_bq, schema, rows, serialize, job_config):
+        with self.metrics.timer('convert'):
+            file_obj = serialize(schema, rows)
+        self.metrics.record('bytes_written', file_obj.getbuffer().nbytes)
+        with self.metrics.timer('write'):
+            load_job = self.__client.load_table_from_file(
+                file_obj, table_bq, job_config=job_config)
+            load_job.result()
+        self.metrics.record('round_trips')
+        self.metrics.record('rows_written', len(rows))
+
+    def __get_serializer(self, source_format):
+        serializers = {
+            'NEWLINE_DELIMITED_JSON': self.__serialize_json,
+            'AVRO': self.__serialize_avro,
+            'PARQUET': self.__serialize_parquet
+        }
+        return serializers[source_format]
+
+    def __serialize_json(self, schema, rows):
+        column_names = [column_name for column_name, _ in schema]
+        file_obj = io.BytesIO()
+        with gzip.GzipFile(fileobj=file_obj, mode='wb', compresslevel=1) as f:
+            for row in rows:
+                line = json.dumps(dict(zip(column_names, row)), default=str)
+                f.write(line.encode('utf-8') + b'\n')
+        file_obj.seek(0)
+        return file_obj
+
+    def __serialize_avro(self, schema, rows):
+        import fastavro
+        avro_schema = {
+            'type': 'record',
+            'name': 'Row',
+            'fields': [{'name': name, 'type': ['null', self.ADAPTER_TO_AVRO[t]]}
+                       for name, t in schema]
+        }
+        column_names = [column_name for column_name, _ in schema]
+        plan = [str if t == 'DATETIME' else None for _, t in schema]
+        records = (dict(zip(column_names, convert_row(row, plan)))
+                   for row in rows)
+        file_obj = io.BytesIO()
+        fastavro.writer(file_obj, fastavro.parse_schema(avro_schema),
+                        records, codec='deflate')
+        file_obj.seek(0)
+        return file_obj
+
+    def __serialize_parquet(self, schema, rows):
+        import pyarrow
+        import pyarrow.parquet
+        arrow_schema = pyarrow.schema(
+            [(name, get_arrow_type(t)) for name, t in schema])
+        columns = [list(column) for column in zip(*rows)]
+        arrow_table = pyarrow.table(columns, schema=arrow_schema)
+        file_obj = io.BytesIO()
+        pyarrow.parquet.write_table(arrow_table, file_obj, compression='snappy')
+        file_obj.seek(0)
+        return file_obj
+
     def delete_table(self, table_adress):
         table_ref = self.__get_table_ref_from_adress(table_adress)
         self.__client.delete_table(table_ref)
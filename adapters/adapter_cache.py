@@ -0,0 +1,174 @@
+from adapters.adapter_abstract import AdapterAbstract, Table
+from adapters.type_mapping import ADAPTER_TYPES, get_arrow_type
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+
+
+class AdapterCache(AdapterAbstract):
+    """ Caches the results of get_result_table of an adapter on disk.
+
+    Results are stored as lz4 compressed Arrow IPC files, keyed by the
+    adapter identity and the normalized query, so reading an entry runs no
+    code from the cache directory. Results with values Arrow can't hold are
+    not cached, cached NUMERIC values come back with 9 decimal places.
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once the cache grows beyond max_bytes.
+    """
+    SUFFIX = '.arrow'
+
+    def __init__(self, adapter, cache_dir, ttl=3600, max_bytes=2 ** 30):
+        super().__init__()
+        self.__adapter = adapter
+        self.__cache_dir = cache_dir
+        self.__ttl = ttl
+        self.__max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def __enter__(self):
+        self.__adapter.__enter__()
+        return self
+
+    def __exit__(self, *exception):
+        self.__adapter.__exit__(*exception)
+
+    def get_identity(self):
+        return self.__adapter.get_identity()
+
+    def has_stable_order(self):
+        return self.__adapter.has_stable_order()
+
+    def get_result_table(self, query, *args, **kwargs):
+        file_name = self.__get_file_name(query, args, kwargs)
+        cached_table = self.__read_cached_table(file_name)
+        if cached_table:
+            self.metrics.record('cache_hits')
+            return cached_table
+        self.metrics.record('cache_misses')
+        table = self.__adapter.get_result_table(query, *args, **kwargs)
+        batch_iter = self.__write_through(table, file_name)
+        return Table.from_batches(table.schema, batch_iter)
+
+    def __get_file_name(self, query, args, kwargs):
+        normalized_query = re.sub(r'\s+', ' ', query).strip().rstrip(';')
+        key = repr((self.get_identity(), normalized_query, args,
+                    sorted(kwargs.items())))
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.__cache_dir, digest + self.SUFFIX)
+
+    def __read_cached_table(self, file_name):
+        import pyarrow
+        import pyarrow.ipc
+        if not os.path.exists(file_name):
+            return None
+        try:
+            # the footer is written last, a truncated entry has none
+            reader = pyarrow.ipc.open_file(pyarrow.memory_map(file_name))
+            header = {key.decode(): json.loads(value)
+                      for key, value in reader.metadata.items()}
+        except (OSError, ValueError, pyarrow.ArrowException):
+            header = None
+        if not header or time.time() - header['created'] > self.__ttl:
+            self.__remove(file_name)
+            return None
+        os.utime(file_name)
+        schema = [tuple(column) for column in header['schema']]
+        return Table.from_batches(schema, self.__read_batches(reader))
+
+    def __read_batches(self, reader):
+        for i in range(reader.num_record_batches):
+            record_batch = reader.get_batch(i)
+            yield tuple(column.to_pylist() for column in record_batch.columns)
+
+    def __write_through(self, table, file_name):
+        if any(t not in ADAPTER_TYPES for _, t in table.schema):
+            yield from table.batch_iter()
+            return
+        writer = _CacheWriter(table.schema, self.__cache_dir)
+        try:
+            for batch in table.batch_iter():
+                writer.write(batch)
+                yield batch
+            if writer.finish():
+                os.replace(writer.file_name, file_name)
+        finally:
+            writer.abort()
+            self.__remove(writer.file_name)
+        self.__evict()
+
+    def __evict(self):
+        entries = []
+        for entry in os.scandir(self.__cache_dir):
+            if entry.name.endswith(self.SUFFIX):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.__max_bytes:
+                break
+            self.__remove(path)
+            total_bytes -= size
+
+    def __remove(self, file_name):
+        try:
+            os.remove(file_name)
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        for entry in os.scandir(self.__cache_dir):
+            if entry.name.endswith(self.SUFFIX):
+                self.__remove(entry.path)
+
+    def create_table(self, table, *args, **kwargs):
+        self.__adapter.create_table(table, *args, **kwargs)
+
+    def append_table(self, table, *args, **kwargs):
+        self.__adapter.append_table(table, *args, **kwargs)
+
+    def delete_table(self, *args, **kwargs):
+        self.__adapter.delete_table(*args, **kwargs)
+
+
+class _CacheWriter:
+    # stops caching instead of failing the read if a value doesn't fit
+    def __init__(self, schema, cache_dir):
+        import pyarrow
+        import pyarrow.ipc
+        self.__arrow_schema = pyarrow.schema(
+            [(name, get_arrow_type(t)) for name, t in schema])
+        with tempfile.NamedTemporaryFile(dir=cache_dir, suffix='.tmp',
+                                         delete=False) as temp_file:
+            self.file_name = temp_file.name
+        self.__sink = pyarrow.OSFile(self.file_name, 'wb')
+        header = {'created': time.time(), 'schema': schema}
+        self.__writer = pyarrow.ipc.new_file(
+            self.__sink, self.__arrow_schema,
+            options=pyarrow.ipc.IpcWriteOptions(compression='lz4'),
+            metadata={key: json.dumps(value) for key, value in header.items()})
+        self.__failed = False
+
+    def write(self, batch):
+        import pyarrow
+        if self.__failed:
+            return
+        try:
+            self.__writer.write_batch(pyarrow.record_batch(
+                list(batch), schema=self.__arrow_schema))
+        except (pyarrow.ArrowException, TypeError, ValueError,
+                OverflowError):
+            self.__failed = True
+
+    def finish(self):
+        """ Writes the footer, returns whether the entry is complete """
+        if not self.__failed:
+            self.__writer.close()
+        self.__sink.close()
+        return not self.__failed
+
+    def abort(self):
+        if not self.__sink.closed:
+            self.__sink.close()
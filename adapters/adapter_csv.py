@@ -1,39 +1,113 @@
-from adapters.adapter_abstract import AdapterAbstract, Table
-from collections import defaultdict
+from adapters.adapter_abstract import (AdapterAbstract, Table, batch_to_rows,
+                                       rows_to_batch)
+from adapters.type_mapping import (compile_text_plan, get_arrow_type,
+                                   parse_text_batch)
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import (ProcessPoolExecutor, wait,
+                                FIRST_COMPLETED)
 import csv
+import functools
+import gzip
+import io
+import itertools
+import mmap
 import re
 import os
 
 
 class AdapterCsv(AdapterAbstract):
-    ADAPTER_TO_PYTHON = {
-        'INTEGER': int,
-        'FLOAT': float,
-        'STRING': str
+    EXTENSION_TO_COMPRESSION = {
+        '.gz': 'gzip',
+        '.zst': 'zstd',
+        '.lz4': 'lz4'
     }
 
     def __init__(self):
         super().__init__()
 
-    def create_table(self, table, file_name):
-        with open(file_name, 'w', newline='') as csvfile:
+    def create_table(self, table, file_name, chunksize=1000, compression=None,
+                     buffering=2 ** 20):
+        with self.__open(file_name, 'w', compression, buffering) as csvfile:
             writer = csv.writer(csvfile)
             writer.writerow(table.schema)
-            for row in table.row_iter:
-                writer.writerow(row)
+            self.__write_rows(writer, table, chunksize)
+        self.metrics.record('bytes_written', os.path.getsize(file_name))
 
-    def get_result_table(self, file_name):
-        schema = self.__get_table_schema(file_name)
-        row_iter = self.__get_row_iter(file_name)
-        return Table(schema, row_iter)
+    def append_table(self, table, file_name, chunksize=1000, compression=None,
+                     buffering=2 ** 20):
+        if not os.path.exists(file_name):
+            return self.create_table(table, file_name, chunksize, compression,
+                                     buffering)
+        file_size = os.path.getsize(file_name)
+        with self.__open(file_name, 'a', compression, buffering) as csvfile:
+            self.__write_rows(csv.writer(csvfile), table, chunksize)
+        self.metrics.record('bytes_written',
+                            os.path.getsize(file_name) - file_size)
+
+    def __write_rows(self, writer, table, chunksize):
+        batches = self.metrics.counted(table.batch_iter(chunksize),
+                                       'rows_written')
+        for batch in batches:
+            with self.metrics.timer('write'):
+                writer.writerows(batch_to_rows(batch))
+
+    def get_result_table(self, file_name, chunksize=1000, engine='python',
+                         compression=None):
+        compression = self.__get_compression(file_name, compression)
+        if engine == 'mmap':
+            self.__check_uncompressed(compression)
+            return self.__get_mapped_table(file_name, chunksize)
+        schema = self.__get_table_schema(file_name, compression)
+        if engine == 'arrow':
+            batch_iter = self.metrics.timed(self.__get_arrow_batch_iter(
+                file_name, schema, compression), 'fetch')
+        else:
+            batch_iter = self.__get_batch_iter(
+                file_name, chunksize, compression)
+        return Table.from_batches(
+            schema, self.__count_read(batch_iter, file_name))
+
+    def __count_read(self, batch_iter, file_name):
+        yield from self.metrics.counted(batch_iter, 'rows_read')
+        self.metrics.record('bytes_read', os.path.getsize(file_name))
+
+    def __check_uncompressed(self, compression):
+        if compression:
+            raise ValueError('memory-mapped reads need an uncompressed file')
+
+    def __get_compression(self, file_name, compression):
+        if compression is None:
+            _, extension = os.path.splitext(file_name)
+            return self.EXTENSION_TO_COMPRESSION.get(extension)
+        return compression
+
+    def __open(self, file_name, mode, compression, buffering=-1):
+        compression = self.__get_compression(file_name, compression)
+        if compression is None:
+            return open(file_name, mode, buffering=buffering, newline='')
+        opener = self.__get_compressed_opener(compression)
+        return opener(file_name, mode + 't', newline='')
 
-    def __get_table_schema(self, file_name):
-        header = self.__get_table_header(file_name)
+    def __get_compressed_opener(self, compression):
+        if compression == 'gzip':
+            return functools.partial(gzip.open, compresslevel=6)
+        if compression == 'zstd':
+            import zstandard
+            return zstandard.open
+        if compression == 'lz4':
+            import lz4.frame
+            return lz4.frame.open
+        raise ValueError(f'unknown compression {compression}')
+
+    def __get_table_schema(self, file_name, compression=None):
+        header = self.__get_table_header(file_name, compression)
         schema = self.__get_schema_from_header(header)
         return schema
 
-    def __get_table_header(self, file_name):
-        with open(file_name, newline='') as csvfile:
+    def __get_table_header(self, file_name, compression):
+        with self.__open(file_name, 'r', compression) as csvfile:
             reader = csv.reader(csvfile)
             header = next(reader)
         return header
@@ -45,25 +119,160 @@ class AdapterCsv(AdapterAbstract):
             schema.append(tuple(column_schema))
         return schema
 
-    def __get_row_iter(self, file_name):
-        with open(file_name, newline='') as csvfile:
+    def __get_batch_iter(self, file_name, chunksize, compression):
+        with self.__open(file_name, 'r', compression) as csvfile:
             reader = csv.reader(csvfile)
             schema = self.__get_schema_from_header(next(reader))
-            for row in reader:
-                converted_row = self.__convert_row(row, schema)
-                yield(converted_row)
-
-    def __convert_row(self, row, schema):
-        _, column_types = zip(*schema)
-        converted_row = []
-        for col_nr, item in enumerate(row):
-            item = self.__convert_to_python_type(item, column_types[col_nr])
-            converted_row.append(item)
-        return tuple(converted_row)
-
-    def __convert_to_python_type(self, item, schema_type):
-        convert = defaultdict(str, self.ADAPTER_TO_PYTHON)
-        return convert[schema_type](item)
+            yield from self.__read_batches(reader, schema, chunksize)
+
+    def __read_batches(self, reader, schema, chunksize):
+        converters = self.__get_converters(schema)
+        while True:
+            with self.metrics.timer('fetch'):
+                rows = list(itertools.islice(reader, chunksize))
+            if not rows:
+                break
+            with self.metrics.timer('convert'):
+                batch = self.__convert_batch(rows_to_batch(rows), converters)
+            yield batch
+
+    def __get_mapped_table(self, file_name, chunksize):
+        mapped = self.__map_file(file_name)
+        lines = self.__get_mapped_lines(mapped)
+        reader = csv.reader(line.decode('utf-8') for line in lines)
+        schema = self.__get_schema_from_header(next(reader))
+        batch_iter = self.__read_mapped_batches(
+            mapped, reader, schema, chunksize)
+        return Table.from_batches(
+            schema, self.__count_read(batch_iter, file_name))
+
+    def __read_mapped_batches(self, mapped, reader, schema, chunksize):
+        with mapped:
+            yield from self.__read_batches(reader, schema, chunksize)
+
+    def __map_file(self, file_name):
+        with open(file_name, 'rb') as csvfile:
+            return mmap.mmap(csvfile.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __get_mapped_lines(self, mapped, slabsize=2 ** 20):
+        position = 0
+        while position < len(mapped):
+            end = mapped.find(b'\n', position + slabsize)
+            end = len(mapped) if end == -1 else end + 1
+            yield from mapped[position:end].splitlines(keepends=True)
+            position = end
+
+    def get_row_offsets(self, file_name):
+        """ Returns the byte offset at which each row after the header starts"""
+        self.__check_uncompressed(self.__get_compression(file_name, None))
+        offsets = array('q')
+        position = 0
+
+        def read_lines(lines):
+            nonlocal position
+            for line in lines:
+                position += len(line)
+                yield line.decode('utf-8')
+
+        with self.__map_file(file_name) as mapped:
+            reader = csv.reader(read_lines(self.__get_mapped_lines(mapped)))
+            next(reader)
+            offsets.append(position)
+            for _ in reader:
+                offsets.append(position)
+        offsets.pop()
+        return offsets
+
+    def __get_converters(self, schema):
+        return compile_text_plan(schema)
+
+    def __convert_batch(self, batch, converters):
+        return parse_text_batch(batch, converters)
+
+    def __get_arrow_batch_iter(self, file_name, schema, compression):
+        import pyarrow
+        import pyarrow.csv
+        column_names = [column_name for column_name, _ in schema]
+        column_types = {name: get_arrow_type(t) for name, t in schema}
+        reader = pyarrow.csv.open_csv(
+            pyarrow.input_stream(file_name, compression=compression),
+            read_options=pyarrow.csv.ReadOptions(
+                skip_rows=1, column_names=column_names),
+            convert_options=pyarrow.csv.ConvertOptions(
+                column_types=column_types))
+        return self.__read_arrow_batches(reader)
+
+    def __read_arrow_batches(self, reader):
+        for record_batch in reader:
+            yield tuple(column.to_pylist() for column in record_batch.columns)
+
+    def get_parallel_result_table(self, file_name, processes=None,
+                                  ordered=True, row_offsets=None,
+                                  range_size=2 ** 24):
+        self.__check_uncompressed(self.__get_compression(file_name, None))
+        schema = self.__get_table_schema(file_name)
+        ranges = self.__get_byte_ranges(file_name, range_size, row_offsets)
+        converters = self.__get_converters(schema)
+        batch_iter = self.metrics.timed(self.__read_ranges(
+            file_name, ranges, converters, processes, ordered), 'fetch')
+        return Table.from_batches(
+            schema, self.__count_read(batch_iter, file_name))
+
+    def __get_byte_ranges(self, file_name, range_size, row_offsets):
+        # Without row offsets the ranges are split at the next newline,
+        # so quoted fields must not contain newlines
+        with open(file_name, 'rb') as csvfile:
+            header_end = len(csvfile.readline())
+            file_size = os.fstat(csvfile.fileno()).st_size
+            starts = [header_end]
+            while starts[-1] + range_size < file_size:
+                start = starts[-1] + range_size
+                if row_offsets is None:
+                    csvfile.seek(start - 1)
+                    start += len(csvfile.readline()) - 1
+                else:
+                    index = bisect_left(row_offsets, start)
+                    start = row_offsets[index] \
+                        if index < len(row_offsets) else file_size
+                if start >= file_size:
+                    break
+                starts.append(start)
+        return list(zip(starts, starts[1:] + [file_size]))
+
+    def __read_ranges(self, file_name, ranges, converters, processes,
+                      ordered):
+        processes = processes or os.cpu_count()
+        with ProcessPoolExecutor(processes) as executor:
+            window = processes * 2
+            pending = deque()
+            try:
+                for start, end in ranges:
+                    if len(pending) >= window:
+                        yield from self.__collect_ranges(pending, ordered)
+                    pending.append(executor.submit(
+                        _read_range, file_name, start, end, converters))
+                while pending:
+                    yield from self.__collect_ranges(pending, ordered)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __collect_ranges(self, pending, ordered):
+        if ordered:
+            yield pending.popleft().result()
+            return
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+            yield future.result()
 
     def delete_table(self, file_name):
         os.remove(file_name)
+
+
+def _read_range(file_name, start, end, converters):
+    with open(file_name, 'rb') as csvfile:
+        csvfile.seek(start)
+        text = csvfile.read(end - start).decode('utf-8')
+    rows = list(csv.reader(io.StringIO(text, newline='')))
+    return parse_text_batch(rows_to_batch(rows), converters)
@@ -1,29 +1,41 @@
-from adapters.adapter_abstract import AdapterAbstract, Table
+from adapters.adapter_abstract import (AdapterAbstract, Table, batch_to_rows,
+                                       rows_to_batch)
+from adapters.connection_pool import ConnectionPool
+from adapters.streams import fan_in
+from adapters.type_mapping import (compile_plan, convert_batch,
+                                   format_duration, get_supported_schema)
+from concurrent.futures import ThreadPoolExecutor
 import mysql.connector
 from mysql.connector import FieldType
+import functools
+import os
+import queue
+import tempfile
+import threading
+import time
 
 
 class AdapterMysql(AdapterAbstract):
     MYSQL_TO_ADAPTER = {
-        'DECIMAL': 'FLOAT',
+        'DECIMAL': 'NUMERIC',
         'TINY': 'INTEGER',
         'SHORT': 'INTEGER',
         'LONG': 'INTEGER',
         'FLOAT': 'FLOAT',
         'DOUBLE': 'FLOAT',
         'NULL': 'INTEGER',
-        'TIMESTAMP': 'STRING',
+        'TIMESTAMP': 'TIMESTAMP',
         'LONGLONG': 'INTEGER',
         'INT24': 'INTEGER',
-        'DATE': 'STRING',
+        'DATE': 'DATE',
         'TIME': 'STRING',
-        'DATETIME': 'STRING',
+        'DATETIME': 'DATETIME',
         'YEAR': 'INTEGER',
-        'NEWDATE': 'STRING',
+        'NEWDATE': 'DATE',
         'VARCHAR': 'STRING',
         'BIT': 'INTEGER',
         'JSON': 'STRING',
-        'NEWDECIMAL': 'INTEGER',
+        'NEWDECIMAL': 'NUMERIC',
         'ENUM': 'STRING',
         'SET': 'STRING',
         'TINY_BLOB': 'STRING',
@@ -38,58 +50,256 @@ class AdapterMysql(AdapterAbstract):
     ADAPTER_TO_MYSQL = {
         'INTEGER': 'INTEGER',
         'FLOAT': 'FLOAT',
-        'STRING': 'TEXT'
+        'STRING': 'TEXT',
+        'BOOLEAN': 'BOOLEAN',
+        'NUMERIC': 'DECIMAL(38, 9)',
+        'DATE': 'DATE',
+        'DATETIME': 'DATETIME(6)',
+        'TIMESTAMP': 'DATETIME(6)',
+        'TIME': 'TIME(6)'
     }
 
-    def __init__(self, db_config):
+    # by MySQL type, TIME is a duration beyond a time of day
+    READ_CONVERTERS = {
+        'TIME': format_duration
+    }
+
+    TSV_ESCAPES = str.maketrans({
+        '\\': '\\\\',
+        '\t': '\\t',
+        '\n': '\\n',
+        '\r': '\\r',
+        '\0': '\\0'
+    })
+
+    def __init__(self, db_config, pool_size=None, pool_idle_timeout=300,
+                 pool_timeout=30):
         super().__init__()
         self.__db_config = db_config
+        self.__pool = self.__get_pool(pool_size, pool_idle_timeout)
+        self.__pool_timeout = pool_timeout
+        self.rows_per_second = None
 
     def __enter__(self):
-        self.__connection = mysql.connector.connect(**self.__db_config)
+        self.__connection = self.__connect()
         self.__cursor = self.__connection.cursor()
         return self
 
     def __exit__(self, *exception):
         super().__exit__(*exception)
         self.__cursor.close()
-        self.__connection.close()
+        self.__disconnect(self.__connection)
+
+    def __get_pool(self, pool_size, pool_idle_timeout):
+        if not pool_size:
+            return None
+        connect = functools.partial(self.__create_connection, self.__db_config)
+        return ConnectionPool.get_pool(
+            self.__db_config, connect, size=pool_size,
+            idle_timeout=pool_idle_timeout)
+
+    @staticmethod
+    def __create_connection(db_config):
+        return mysql.connector.connect(**db_config)
+
+    def __connect(self):
+        if self.__pool:
+            return self.__pool.acquire()
+        return self.__create_connection(self.__db_config)
+
+    def __connect_worker(self):
+        # the adapter already holds a pooled connection, waiting without a
+        # timeout could wait for itself
+        if not self.__pool:
+            return self.__connect()
+        try:
+            return self.__pool.acquire(self.__pool_timeout)
+        except TimeoutError:
+            raise TimeoutError(
+                f'no pooled connection for a worker after '
+                f'{self.__pool_timeout}s, the pool is used up') from None
+
+    def __check_pool_size(self, workers):
+        if self.__pool and workers >= self.__pool.size:
+            raise ValueError(
+                f'{workers} workers and the adapter need a pool_size of at '
+                f'least {workers + 1}, the pool has {self.__pool.size}')
+
+    def __disconnect(self, connection):
+        if self.__pool:
+            self.__pool.release(connection)
+        else:
+            connection.close()
+
+    def get_identity(self):
+        server = [self.__db_config.get(key)
+                  for key in ('host', 'port', 'database', 'user')]
+        return f'{type(self).__name__}{server}'
+
+    def has_stable_order(self):
+        return False
 
-    def get_result_table(self, query):
-        self.__cursor.execute(query)
-        schema = self.__get_table_schema()
-        row_iter = self.__get_row_iter()
-        return Table(schema, row_iter)
+    def get_result_table(self, query, fetchsize=1000, stream=False,
+                         params=None):
+        """ Returns the query result, fetched fetchsize rows at a time.
 
-    def __get_table_schema(self):
-        column_names = [column[0] for column in self.__cursor.description]
-        column_types = [column[1] for column in self.__cursor.description]
+        The adapter's cursor follows the buffered setting of db_config,
+        stream=True reads over an own unbuffered cursor even when db_config
+        buffers, so rows are only transferred as batches are consumed """
+        cursor = self.__get_read_cursor(stream)
+        self.__execute(cursor, query, params)
+        schema = self.__get_table_schema(cursor)
+        plan = self.get_read_plan(self.__get_mysql_types(cursor))
+        batch_iter = self.__get_batch_iter(cursor, fetchsize, stream, plan)
+        return Table.from_batches(schema, batch_iter)
+
+    @classmethod
+    def get_read_plan(cls, mysql_types):
+        return [cls.READ_CONVERTERS.get(mysql_type)
+                for mysql_type in mysql_types]
+
+    def __get_read_cursor(self, stream):
+        if stream:
+            return self.__connection.cursor(buffered=False)
+        return self.__cursor
+
+    def __get_table_schema(self, cursor):
+        column_names = [column[0] for column in cursor.description]
+        column_types = self.__get_mysql_types(cursor)
         column_types = self.__map_to_adapter_datatypes(column_types)
         schema = zip(column_names, column_types)
         return list(schema)
 
+    def __get_mysql_types(self, cursor):
+        return [FieldType.get_info(column[1]) for column in cursor.description]
+
     def __map_to_adapter_datatypes(self, datatypes):
-        adapter_datatypes = [
-            self.MYSQL_TO_ADAPTER[FieldType.get_info(d)] for d in datatypes]
+        adapter_datatypes = [self.MYSQL_TO_ADAPTER[d] for d in datatypes]
         return adapter_datatypes
 
-    def __get_row_iter(self, chunksize=10):
-        while True:
-            rows = self.__cursor.fetchmany(chunksize)
-            if rows:
-                for row in rows:
-                    yield row
-            else:
-                break
-
-    def create_table(self, table, table_adress):
+    def __execute(self, cursor, query, params=None):
+        with self.metrics.timer('query'):
+            cursor.execute(query, params)
+        self.metrics.record('round_trips')
+
+    def __get_batch_iter(self, cursor, fetchsize, stream, plan):
+        try:
+            while True:
+                with self.metrics.timer('fetch'):
+                    rows = cursor.fetchmany(fetchsize)
+                if not rows:
+                    break
+                yield self.__convert_read_batch(rows_to_batch(rows), plan)
+        finally:
+            if stream:
+                cursor.close()
+
+    def __convert_read_batch(self, batch, plan):
+        if any(plan):
+            with self.metrics.timer('convert'):
+                batch = convert_batch(batch, plan)
+        self.metrics.record('rows_read', len(batch[0]))
+        return batch
+
+    def get_partitioned_result_table(self, table_name, split_column,
+                                     partitions=4, columns='*', fetchsize=1000,
+                                     prefetch=4, ordered=False):
+        """ Reads table_name in ranges of the integer or date split_column,
+        each range over its own connection """
+        query = f'SELECT {columns} FROM {table_name}'
+        schema, plan, _ = self.__fetch_all(f'{query} LIMIT 0')
+        bounds = self.__get_split_bounds(table_name, split_column, partitions)
+        partition_queries = self.__get_partition_queries(
+            query, split_column, bounds)
+        self.__check_pool_size(len(partition_queries))
+        streams = [
+            self.__get_partition_reader(partition_query, params, fetchsize, plan)
+            for partition_query, params in partition_queries]
+        batch_iter = fan_in(streams, len(streams), prefetch, ordered)
+        return Table.from_batches(schema, batch_iter)
+
+    def __get_split_bounds(self, table_name, split_column, partitions):
+        _, _, ((low, high),) = self.__fetch_all(
+            f'SELECT MIN({split_column}), MAX({split_column}) '
+            f'FROM {table_name}')
+        if low is None:
+            return []
+        bounds = {low + (high - low) * i // partitions
+                  for i in range(1, partitions)}
+        return sorted(bounds - {low})
+
+    def __fetch_all(self, query):
+        # buffered, so no unread result blocks the connection afterwards
+        cursor = self.__connection.cursor(buffered=True)
+        try:
+            self.__execute(cursor, query)
+            rows = cursor.fetchall()
+            plan = self.get_read_plan(self.__get_mysql_types(cursor))
+            return self.__get_table_schema(cursor), plan, rows
+        finally:
+            cursor.close()
+
+    def __get_partition_queries(self, query, split_column, bounds):
+        if not bounds:
+            return [(query, None)]
+        queries = [(f'{query} WHERE {split_column} < %s '
+                    f'OR {split_column} IS NULL', (bounds[0],))]
+        queries += [(f'{query} WHERE {split_column} >= %s '
+                     f'AND {split_column} < %s', (low, high))
+                    for low, high in zip(bounds, bounds[1:])]
+        queries.append((f'{query} WHERE {split_column} >= %s', (bounds[-1],)))
+        return queries
+
+    def __get_partition_reader(self, query, params, fetchsize, plan):
+        def read_partition():
+            connection = self.__connect_worker()
+            try:
+                cursor = connection.cursor(buffered=False)
+                self.__execute(cursor, query, params)
+                yield from self.__get_batch_iter(cursor, fetchsize, True, plan)
+            finally:
+                self.__disconnect(connection)
+        return read_partition
+
+    def get_incremental_table(self, query, column, watermark, ordered=False,
+                              **kwargs):
+        query = f'SELECT * FROM ({query}) AS incremental'
+        params = None
+        if watermark is not None:
+            query += f' WHERE {column} > %s'
+            params = (watermark,)
+        if ordered:
+            query += f' ORDER BY {column}'
+        return self.get_result_table(query, params=params, **kwargs)
+
+    def create_table(self, table, table_adress, indexes=(), **kwargs):
         self.__create_empty_table(table.schema, table_adress)
-        self.__insert_data_in_table(table.row_iter, table_adress)
+        self.append_table(table, table_adress, **kwargs)
+        if indexes:
+            self.__create_indexes(table_adress, indexes)
+
+    def append_table(self, table, table_adress, chunksize=1000,
+                     commit_every=None, bulk=False, bulk_chunksize=100000,
+                     writers=None):
+        dest_schema = get_supported_schema(table.schema, self.ADAPTER_TO_MYSQL)
+        write_rows = functools.partial(
+            self.__write_batch, compile_plan(table.schema, dest_schema),
+            self.__load_rows if bulk else self.__insert_rows)
+        if bulk:
+            chunksize = bulk_chunksize
+        if writers:
+            self.__check_pool_size(writers)
+            self.__insert_data_in_parallel(
+                table, table_adress, chunksize, commit_every or 1,
+                write_rows, writers)
+        else:
+            self.__insert_data_in_table(
+                table, table_adress, chunksize, commit_every, write_rows)
 
     def __create_empty_table(self, table_schema, table_name):
         table_schema_mysql = self.__format_table_schema(table_schema)
         query = f'CREATE TABLE {table_name} ({table_schema_mysql})'
-        self.__cursor.execute(query)
+        self.__execute(self.__cursor, query)
 
     def __format_table_schema(self, table_schema):
         column_names, column_types = zip(*table_schema)
@@ -100,16 +310,148 @@ class AdapterMysql(AdapterAbstract):
         return formated_schema_string
 
     def __map_to_mysql_datatypes(self, datatypes):
-        mysql_datatypes = [self.ADAPTER_TO_MYSQL[datatype]
+        mysql_datatypes = [self.ADAPTER_TO_MYSQL.get(datatype, 'TEXT')
                            for datatype in datatypes]
         return mysql_datatypes
 
-    def __insert_data_in_table(self, row_iter, table_name):
-        query = f'INSERT INTO {table_name} VALUES '
-        for row in row_iter:
-            self.__cursor.execute(query + f'{row}')
-        self.__connection.commit()
+    def __create_indexes(self, table_name, indexes):
+        index_list = []
+        for columns in indexes:
+            if isinstance(columns, str):
+                columns = (columns,)
+            index_name = '_'.join(('idx',) + tuple(columns))
+            index_list.append(f'ADD INDEX {index_name} ({", ".join(columns)})')
+        query = f'ALTER TABLE {table_name} {", ".join(index_list)}'
+        self.__execute(self.__cursor, query)
+
+    def __insert_data_in_table(self, table, table_name, chunksize,
+                               commit_every, write_rows):
+        start = time.perf_counter()
+        batches = table.batch_iter(chunksize)
+        row_count = self.__write_batches(
+            self.__connection, self.__cursor, batches, table.schema,
+            table_name, commit_every, write_rows)
+        self.rows_per_second = self.__get_rate(row_count, start)
+
+    def __write_batches(self, connection, cursor, batches, table_schema,
+                        table_name, commit_every, write_rows):
+        row_count = 0
+        for chunk_nr, batch in enumerate(batches, 1):
+            row_count += write_rows(cursor, batch, table_schema, table_name)
+            if commit_every and chunk_nr % commit_every == 0:
+                self.__commit(connection)
+        self.__commit(connection)
+        return row_count
+
+    def __write_batch(self, plan, write_rows, cursor, batch, table_schema,
+                      table_name):
+        if any(plan):
+            with self.metrics.timer('convert'):
+                batch = convert_batch(batch, plan)
+        rows = list(batch_to_rows(batch))
+        with self.metrics.timer('write'):
+            write_rows(cursor, rows, table_schema, table_name)
+        self.metrics.record('round_trips')
+        self.metrics.record('rows_written', len(rows))
+        return len(rows)
+
+    def __commit(self, connection):
+        with self.metrics.timer('commit'):
+            connection.commit()
+        self.metrics.record('round_trips')
+
+    def __insert_data_in_parallel(self, table, table_name, chunksize,
+                                  commit_every, write_rows, writers):
+        start = time.perf_counter()
+        batches = queue.Queue(writers)
+        stop = threading.Event()
+        with ThreadPoolExecutor(writers) as executor:
+            futures = [executor.submit(
+                self.__run_writer, batches, stop, table.schema, table_name,
+                commit_every, write_rows) for _ in range(writers)]
+            try:
+                for batch in table.batch_iter(chunksize):
+                    self.__put_batch(batches, batch, futures)
+                for _ in futures:
+                    self.__put_batch(batches, None, futures)
+            except BaseException:
+                stop.set()
+                raise
+            row_count = sum(future.result() for future in futures)
+        self.rows_per_second = self.__get_rate(row_count, start)
+
+    def __put_batch(self, batches, batch, futures):
+        while True:
+            try:
+                return batches.put(batch, timeout=0.1)
+            except queue.Full:
+                self.__check_writers(futures)
+
+    def __check_writers(self, futures):
+        for future in futures:
+            if future.done() and future.exception():
+                raise future.exception()
+
+    def __run_writer(self, batches, stop, table_schema, table_name,
+                     commit_every, write_rows):
+        connection = self.__connect_worker()
+        try:
+            cursor = connection.cursor()
+            try:
+                return self.__write_batches(
+                    connection, cursor, self.__get_queued_batches(batches, stop),
+                    table_schema, table_name, commit_every, write_rows)
+            finally:
+                cursor.close()
+        finally:
+            self.__disconnect(connection)
+
+    def __get_queued_batches(self, batches, stop):
+        while not stop.is_set():
+            try:
+                batch = batches.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if batch is None:
+                return
+            yield batch
+        raise RuntimeError('parallel write was aborted')
+
+    def __insert_rows(self, cursor, rows, table_schema, table_name):
+        placeholders = ', '.join(['%s'] * len(table_schema))
+        query = f'INSERT INTO {table_name} VALUES ({placeholders})'
+        cursor.executemany(query, rows)
+
+    def __load_rows(self, cursor, rows, table_schema, table_name):
+        file_name = self.__write_tsv(rows)
+        self.metrics.record('bytes_written', os.path.getsize(file_name))
+        try:
+            query = (f'LOAD DATA LOCAL INFILE %s INTO TABLE {table_name} '
+                     'CHARACTER SET utf8mb4')
+            cursor.execute(query, (file_name,))
+        finally:
+            os.remove(file_name)
+
+    def __write_tsv(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.tsv', encoding='utf-8',
+                                         newline='\n', delete=False) as tsv:
+            tsv.writelines(self.__format_tsv_line(row) for row in rows)
+        return tsv.name
+
+    def __format_tsv_line(self, row):
+        return '\t'.join(self.__format_tsv_value(v) for v in row) + '\n'
+
+    def __format_tsv_value(self, value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return str(int(value))
+        return str(value).translate(self.TSV_ESCAPES)
+
+    def __get_rate(self, row_count, start):
+        elapsed = time.perf_counter() - start
+        return row_count / elapsed if elapsed else float(row_count)
 
     def delete_table(self, table_adress):
         query = f'DROP TABLE {table_adress}'
-        self.__cursor.execute(query)
+        self.__execute(self.__cursor, query)
@@ -0,0 +1,214 @@
+from adapters.adapter_abstract import AdapterAbstract, Table
+from adapters.type_mapping import (ADAPTER_TYPES, convert_table,
+                                   get_adapter_type, get_arrow_type,
+                                   get_supported_schema)
+import json
+import operator
+import os
+import tempfile
+
+
+class AdapterParquet(AdapterAbstract):
+    SCHEMA_METADATA_KEY = b'adapters.schema'
+
+    OPERATORS = {
+        '=': operator.eq,
+        '==': operator.eq,
+        '!=': operator.ne,
+        '<': operator.lt,
+        '<=': operator.le,
+        '>': operator.gt,
+        '>=': operator.ge
+    }
+
+    COMPUTE_FUNCTIONS = {
+        '=': 'equal',
+        '==': 'equal',
+        '!=': 'not_equal',
+        '<': 'less',
+        '<=': 'less_equal',
+        '>': 'greater',
+        '>=': 'greater_equal',
+        'in': 'is_in'
+    }
+
+    def __init__(self):
+        super().__init__()
+
+    def get_result_table(self, file_name, columns=None, filters=(),
+                         batchsize=10000):
+        """ Streams the rows of file_name one row group at a time.
+
+        Only the given columns are decoded. filters is a list of
+        (column, operator, value) tuples that all have to match, row groups
+        whose statistics rule them out are skipped without decoding """
+        import pyarrow.parquet
+        filters = [self.__check_filter(*predicate) for predicate in filters]
+        parquet_file = pyarrow.parquet.ParquetFile(file_name)
+        schema = self.__get_table_schema(parquet_file)
+        if columns is not None:
+            schema_types = dict(schema)
+            schema = [(column, schema_types[column]) for column in columns]
+        column_names = [column_name for column_name, _ in schema]
+        read_columns = column_names + [
+            column for column, _, _ in filters if column not in column_names]
+        row_groups = self.__get_row_groups(parquet_file, filters)
+        self.metrics.record('bytes_read', self.__get_read_bytes(
+            parquet_file, row_groups, read_columns))
+        batch_iter = self.__read_batches(
+            parquet_file, row_groups, read_columns, column_names, filters,
+            batchsize)
+        return Table.from_batches(
+            schema, self.metrics.counted(batch_iter, 'rows_read'))
+
+    def __check_filter(self, column, op, value):
+        if op not in self.COMPUTE_FUNCTIONS:
+            raise ValueError(f'unknown filter operator {op}')
+        return column, op, value
+
+    def __get_table_schema(self, parquet_file):
+        arrow_schema = parquet_file.schema_arrow
+        metadata = arrow_schema.metadata or {}
+        if self.SCHEMA_METADATA_KEY in metadata:
+            return [tuple(column) for column in
+                    json.loads(metadata[self.SCHEMA_METADATA_KEY])]
+        return [(field.name, get_adapter_type(field.type))
+                for field in arrow_schema]
+
+    def __get_row_groups(self, parquet_file, filters):
+        metadata = parquet_file.metadata
+        column_indexes = {metadata.schema.column(i).name: i
+                          for i in range(metadata.num_columns)}
+        return [i for i in range(metadata.num_row_groups)
+                if all(self.__may_match(metadata.row_group(i),
+                                        column_indexes, *predicate)
+                       for predicate in filters)]
+
+    def __may_match(self, row_group, column_indexes, column, op, value):
+        statistics = row_group.column(column_indexes[column]).statistics
+        if statistics is None or not statistics.has_min_max:
+            return True
+        low, high = statistics.min, statistics.max
+        try:
+            if op == 'in':
+                return any(low <= item <= high for item in value)
+            if op in ('=', '=='):
+                return low <= value <= high
+            if op == '!=':
+                return not low == high == value
+            if op in ('<', '<='):
+                return self.OPERATORS[op](low, value)
+            return self.OPERATORS[op](high, value)
+        except TypeError:
+            return True
+
+    def __get_read_bytes(self, parquet_file, row_groups, read_columns):
+        metadata = parquet_file.metadata
+        read_bytes = 0
+        for i in row_groups:
+            row_group = metadata.row_group(i)
+            for j in range(row_group.num_columns):
+                column_chunk = row_group.column(j)
+                if column_chunk.path_in_schema in read_columns:
+                    read_bytes += column_chunk.total_compressed_size
+        return read_bytes
+
+    def __read_batches(self, parquet_file, row_groups, read_columns,
+                       column_names, filters, batchsize):
+        try:
+            if not row_groups:
+                return
+            record_batches = parquet_file.iter_batches(
+                batchsize, row_groups=row_groups, columns=read_columns)
+            for record_batch in self.metrics.timed(record_batches, 'fetch'):
+                with self.metrics.timer('convert'):
+                    batch = self.__convert_record_batch(
+                        record_batch, column_names, filters)
+                if batch and batch[0]:
+                    yield batch
+        finally:
+            parquet_file.close()
+
+    def __convert_record_batch(self, record_batch, column_names, filters):
+        if filters:
+            record_batch = record_batch.filter(
+                self.__get_filter_mask(record_batch, filters))
+        return tuple(record_batch.column(column_name).to_pylist()
+                     for column_name in column_names)
+
+    def __get_filter_mask(self, record_batch, filters):
+        import pyarrow
+        import pyarrow.compute
+        mask = None
+        for column, op, value in filters:
+            values = record_batch.column(column)
+            compute = getattr(pyarrow.compute, self.COMPUTE_FUNCTIONS[op])
+            if op == 'in':
+                column_mask = compute(
+                    values, value_set=pyarrow.array(value, values.type))
+            else:
+                column_mask = compute(values, value)
+            mask = column_mask if mask is None \
+                else pyarrow.compute.and_(mask, column_mask)
+        return mask
+
+    def create_table(self, table, file_name, row_group_size=100000,
+                     compression='snappy'):
+        import pyarrow
+        table = convert_table(
+            table, get_supported_schema(table.schema, ADAPTER_TYPES))
+        arrow_schema = pyarrow.schema(
+            [(name, get_arrow_type(t)) for name, t in table.schema],
+            metadata={self.SCHEMA_METADATA_KEY: json.dumps(table.schema)})
+        self.__write_file(file_name, arrow_schema, (), table, row_group_size,
+                          compression)
+
+    def append_table(self, table, file_name, row_group_size=100000,
+                     compression='snappy'):
+        """ Rewrites file_name with the rows of table as new row groups.
+
+        Parquet files can't grow in place, so every append copies the
+        existing row groups, which are not decoded to Python values """
+        import pyarrow.parquet
+        parquet_file = pyarrow.parquet.ParquetFile(file_name)
+        table = convert_table(table, self.__get_table_schema(parquet_file))
+        self.__write_file(file_name, parquet_file.schema_arrow,
+                          self.__read_row_groups(parquet_file), table,
+                          row_group_size, compression)
+
+    def __read_row_groups(self, parquet_file):
+        try:
+            for i in range(parquet_file.num_row_groups):
+                yield parquet_file.read_row_group(i)
+        finally:
+            parquet_file.close()
+
+    def __write_file(self, file_name, arrow_schema, row_groups, table,
+                     row_group_size, compression):
+        # written next to file_name first, a failed write keeps the old file
+        import pyarrow
+        import pyarrow.parquet
+        directory = os.path.dirname(os.path.abspath(file_name))
+        with tempfile.NamedTemporaryFile(dir=directory, suffix='.parquet',
+                                         delete=False) as temp_file:
+            temp_name = temp_file.name
+        try:
+            with pyarrow.parquet.ParquetWriter(
+                    temp_name, arrow_schema,
+                    compression=compression) as writer:
+                for row_group in row_groups:
+                    writer.write_table(row_group)
+                batches = self.metrics.counted(
+                    table.batch_iter(row_group_size), 'rows_written')
+                for batch in batches:
+                    with self.metrics.timer('write'):
+                        writer.write_batch(pyarrow.record_batch(
+                            list(batch), schema=arrow_schema))
+        except BaseException:
+            os.remove(temp_name)
+            raise
+        self.metrics.record('bytes_written', os.path.getsize(temp_name))
+        os.replace(temp_name, file_name)
+
+    def delete_table(self, file_name):
+        os.remove(file_name)
@@ -0,0 +1,117 @@
+from collections import deque
+import threading
+import time
+
+
+class ConnectionPool:
+    """ Thread-safe pool of database connections.
+
+    Idle connections are health checked before they are handed out and
+    closed once they have been idle for longer than idle_timeout seconds.
+    """
+    __pools = {}
+    __pools_lock = threading.Lock()
+
+    def __init__(self, connect, size=5, idle_timeout=300, health_check=True):
+        self.__connect = connect
+        self.__idle_timeout = idle_timeout
+        self.__health_check = health_check
+        self.__idle = deque()
+        self.__lock = threading.Lock()
+        self.__slots = threading.BoundedSemaphore(size)
+        self.size = size
+
+    @classmethod
+    def get_pool(cls, db_config, connect, size=5, idle_timeout=300,
+                 health_check=True):
+        """ Returns the pool shared by all users of db_config, the settings
+        must match those the pool was created with """
+        key = cls.__get_config_key(db_config)
+        with cls.__pools_lock:
+            if key not in cls.__pools:
+                cls.__pools[key] = cls(connect, size, idle_timeout,
+                                       health_check)
+            pool = cls.__pools[key]
+        settings = (size, idle_timeout, health_check)
+        if pool.__get_settings() != settings:
+            raise ValueError(
+                f'the pool of this db_config already exists with size, '
+                f'idle_timeout and health_check {pool.__get_settings()}, '
+                f'not {settings}')
+        return pool
+
+    @classmethod
+    def close_all(cls):
+        with cls.__pools_lock:
+            pools = list(cls.__pools.values())
+            cls.__pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def __get_settings(self):
+        return self.size, self.__idle_timeout, self.__health_check
+
+    @staticmethod
+    def __get_config_key(db_config):
+        return tuple(sorted((key, repr(value))
+                            for key, value in db_config.items()))
+
+    def acquire(self, timeout=None):
+        if not self.__slots.acquire(timeout=timeout):
+            raise TimeoutError('no connection available in the pool')
+        try:
+            return self.__get_idle_connection() or self.__connect()
+        except BaseException:
+            self.__slots.release()
+            raise
+
+    def release(self, connection):
+        try:
+            connection.rollback()
+        except Exception:
+            self.__close(connection)
+        else:
+            with self.__lock:
+                self.__idle.append((connection, time.monotonic()))
+        finally:
+            self.__slots.release()
+
+    def close(self):
+        with self.__lock:
+            idle, self.__idle = self.__idle, deque()
+        for connection, _ in idle:
+            self.__close(connection)
+
+    def __get_idle_connection(self):
+        self.__evict_idle_connections()
+        while True:
+            with self.__lock:
+                if not self.__idle:
+                    return None
+                connection, _ = self.__idle.pop()
+            if self.__is_healthy(connection):
+                return connection
+            self.__close(connection)
+
+    def __evict_idle_connections(self):
+        evicted = []
+        deadline = time.monotonic() - self.__idle_timeout
+        with self.__lock:
+            while self.__idle and self.__idle[0][1] < deadline:
+                evicted.append(self.__idle.popleft()[0])
+        for connection in evicted:
+            self.__close(connection)
+
+    def __is_healthy(self, connection):
+        if not self.__health_check:
+            return True
+        try:
+            return connection.is_connected()
+        except Exception:
+            return False
+
+    def __close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
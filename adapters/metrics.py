@@ -0,0 +1,75 @@
+from contextlib import contextmanager
+import threading
+import time
+
+
+class Metrics:
+    """ Thread-safe totals of the values an adapter records.
+
+    Every value is recorded under a name, e.g. rows_read per batch or
+    query_seconds per query, and summed up with its count and maximum.
+    Hooks are called with (name, value) for every recorded value and can
+    forward them to a metrics or trace sink.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__hooks = []
+        self.__totals = {}
+
+    def add_hook(self, hook):
+        self.__hooks.append(hook)
+
+    def remove_hook(self, hook):
+        self.__hooks.remove(hook)
+
+    def record(self, name, value=1):
+        with self.__lock:
+            count, total, maximum = self.__totals.get(name, (0, 0, value))
+            self.__totals[name] = (count + 1, total + value,
+                                   max(maximum, value))
+        for hook in self.__hooks:
+            hook(name, value)
+
+    @contextmanager
+    def timer(self, name):
+        """ Records the seconds spent in the block as name_seconds """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(f'{name}_seconds', time.perf_counter() - start)
+
+    def timed(self, iterable, name):
+        """ Yields the items of iterable, recording the seconds spent
+        producing each of them as name_seconds """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(f'{name}_seconds', time.perf_counter() - start)
+            yield item
+
+    def counted(self, batches, name):
+        """ Yields the batches, recording their row counts as name """
+        for batch in batches:
+            self.record(name, len(batch[0]) if batch else 0)
+            yield batch
+
+    def get_total(self, name):
+        with self.__lock:
+            return self.__totals.get(name, (0, 0, 0))[1]
+
+    def snapshot(self):
+        """ Returns {name: {'count', 'total', 'max'}} of all values """
+        with self.__lock:
+            totals = dict(self.__totals)
+        return {name: {'count': count, 'total': total, 'max': maximum}
+                for name, (count, total, maximum) in sorted(totals.items())}
+
+    def reset(self):
+        with self.__lock:
+            self.__totals.clear()
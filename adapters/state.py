@@ -0,0 +1,41 @@
+import datetime
+import decimal
+import json
+import os
+import tempfile
+
+
+def encode_watermark(watermark):
+    if isinstance(watermark, decimal.Decimal):
+        return {'type': 'decimal', 'value': str(watermark)}
+    if isinstance(watermark, datetime.datetime):
+        return {'type': 'datetime', 'value': watermark.isoformat()}
+    if isinstance(watermark, datetime.date):
+        return {'type': 'date', 'value': watermark.isoformat()}
+    return {'type': None, 'value': watermark}
+
+
+def decode_watermark(encoded):
+    if encoded is None:
+        return None
+    decode = {
+        'decimal': decimal.Decimal,
+        'datetime': datetime.datetime.fromisoformat,
+        'date': datetime.date.fromisoformat
+    }.get(encoded['type'])
+    return decode(encoded['value']) if decode else encoded['value']
+
+
+def load_state(state_file):
+    if not os.path.exists(state_file):
+        return {}
+    with open(state_file) as f:
+        return json.load(f)
+
+
+def save_state(state_file, state):
+    # write to a temporary file first, so a crash never leaves a partial state
+    directory = os.path.dirname(os.path.abspath(state_file))
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as f:
+        json.dump(state, f, indent=2)
+    os.replace(f.name, state_file)
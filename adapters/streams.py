@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+
+_DONE = object()
+
+
+def fan_in(streams, max_workers=4, prefetch=4, ordered=True):
+    """Yields the items of several streams that are read concurrently.
+
+    Each stream is a callable returning an iterable. At most `prefetch`
+    items are buffered per stream when ordered (items follow the stream
+    order) and overall when unordered (items come as they arrive).
+    """
+    stop = threading.Event()
+    if ordered:
+        queues = [queue.Queue(prefetch) for _ in streams]
+    else:
+        queues = [queue.Queue(prefetch)] * len(streams)
+    executor = ThreadPoolExecutor(max_workers)
+    try:
+        for stream, stream_queue in zip(streams, queues):
+            executor.submit(_read_stream, stream, stream_queue, stop)
+        if ordered:
+            for stream_queue in queues:
+                yield from _drain(stream_queue, 1)
+        elif queues:
+            yield from _drain(queues[0], len(streams))
+    finally:
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _read_stream(stream, stream_queue, stop):
+    try:
+        for item in stream():
+            if not _put(stream_queue, (item, None), stop):
+                return
+        _put(stream_queue, (_DONE, None), stop)
+    except BaseException as exc:
+        _put(stream_queue, (_DONE, exc), stop)
+
+
+def _put(stream_queue, entry, stop, timeout=0.1):
+    while not stop.is_set():
+        try:
+            stream_queue.put(entry, timeout=timeout)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _drain(stream_queue, stream_count):
+    while stream_count:
+        item, exc = stream_queue.get()
+        if exc is not None:
+            raise exc
+        if item is _DONE:
+            stream_count -= 1
+        else:
+            yield item
@@ -0,0 +1,53 @@
+from adapters.adapter_abstract import Table, check_append, get_column_index
+from adapters.state import (decode_watermark, encode_watermark, load_state,
+                            save_state)
+from collections import namedtuple
+
+SyncResult = namedtuple('SyncResult', ['rows', 'watermark'])
+
+
+def sync(source, query, dest, address, watermark_column, state_file,
+         batchsize=1000, read_kwargs=None, write_kwargs=None):
+    """ Appends the rows of query on source whose watermark_column is
+    greater than the last synced watermark to address on dest.
+
+    The watermark of every destination address is kept in state_file.
+    The first sync of an address creates the destination table with a
+    full copy. Returns a SyncResult with the number of new rows and the
+    new watermark. read_kwargs are passed on to get_incremental_table,
+    write_kwargs to create_table and append_table.
+    """
+    check_append(dest)
+    state = load_state(state_file)
+    created = address in state
+    watermark = decode_watermark(state.get(address))
+    table = source.get_incremental_table(query, watermark_column, watermark,
+                                         **(read_kwargs or {}))
+    column_index = get_column_index(table.schema, watermark_column)
+    tracker = _WatermarkTracker(watermark)
+    batches = tracker.track(table.batch_iter(batchsize), column_index)
+    table = Table.from_batches(table.schema, batches)
+    if created:
+        dest.append_table(table, address, **(write_kwargs or {}))
+    else:
+        dest.create_table(table, address, **(write_kwargs or {}))
+    state[address] = encode_watermark(tracker.watermark)
+    save_state(state_file, state)
+    return SyncResult(tracker.rows, tracker.watermark)
+
+
+class _WatermarkTracker:
+    def __init__(self, watermark):
+        self.watermark = watermark
+        self.rows = 0
+
+    def track(self, batches, column_index):
+        for batch in batches:
+            values = [value for value in batch[column_index]
+                      if value is not None]
+            if values:
+                batch_max = max(values)
+                if self.watermark is None or batch_max > self.watermark:
+                    self.watermark = batch_max
+            self.rows += len(batch[column_index])
+            yield batch
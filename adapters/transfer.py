@@ -0,0 +1,167 @@
+from adapters.adapter_abstract import (Table, check_append, get_batch_length,
+                                       get_column_index)
+from adapters.state import (decode_watermark, encode_watermark, load_state,
+                            save_state)
+from adapters.streams import fan_in
+from collections import namedtuple, defaultdict
+import os
+import time
+
+TransferStats = namedtuple('TransferStats', [
+    'rows', 'batches', 'query_seconds', 'read_seconds', 'write_seconds',
+    'wall_seconds'])
+
+
+def transfer(source, query, dest, address, queue_size=8, batchsize=1000,
+             read_kwargs=None, write_kwargs=None):
+    """ Copies the result of query on source into address on dest, reading
+    and writing concurrently, and returns the TransferStats.
+
+    read_kwargs and write_kwargs are passed on to get_result_table and
+    create_table, e.g. {'stream': True} and {'load_job': True} """
+    timings = defaultdict(float)
+    counts = defaultdict(int)
+    start = time.perf_counter()
+    table = source.get_result_table(query, **(read_kwargs or {}))
+    timings['query'] = time.perf_counter() - start
+
+    def read_batches():
+        return _timed(table.batch_iter(batchsize), timings, 'read')
+
+    batches = fan_in([read_batches], max_workers=1, prefetch=queue_size)
+    batches = _counted(_timed(batches, timings, 'wait'), counts)
+    write_start = time.perf_counter()
+    dest.create_table(Table.from_batches(table.schema, batches), address,
+                      **(write_kwargs or {}))
+    write_seconds = time.perf_counter() - write_start - timings['wait']
+    return TransferStats(
+        counts['rows'], counts['batches'], timings['query'],
+        timings['read'], write_seconds, time.perf_counter() - start)
+
+
+def resumable_transfer(source, query, dest, address, checkpoint_file,
+                       key_column=None, checkpoint_rows=100000, queue_size=8,
+                       batchsize=1000, read_kwargs=None, write_kwargs=None):
+    """ Copies like transfer, but appends checkpoint_rows rows at a time
+    and records the delivered rows in checkpoint_file after each append.
+
+    Rerunning a failed transfer resumes after the last recorded append.
+    With a unique key_column without NULL the source is read ordered by it
+    and only the rows with a greater key are read again. Without it the
+    delivered rows are read again and skipped, which needs a source that
+    returns them in the same order, so MySQL and BigQuery need a
+    key_column. Sources without their own get_incremental_table (CSV,
+    Parquet, cache) sort the whole result in memory for key_column, so
+    rather resume them without it. Rows appended after the last checkpoint
+    are written twice. The checkpoint file is removed when the copy is done.
+
+    read_kwargs are passed on to get_result_table or get_incremental_table,
+    write_kwargs to create_table and append_table.
+    """
+    check_append(dest)
+    if key_column is None and not source.has_stable_order():
+        raise ValueError(f'{type(source).__name__} needs a key_column to '
+                         f'resume, its rows can come in another order')
+    checkpoint = _load_checkpoint(checkpoint_file, query, address, key_column)
+    timings = defaultdict(float)
+    counts = defaultdict(int)
+    start = time.perf_counter()
+    table = _get_resumed_table(source, query, key_column, checkpoint,
+                               read_kwargs or {})
+    timings['query'] = time.perf_counter() - start
+    if not checkpoint['created']:
+        dest.create_table(Table(table.schema, iter(())), address,
+                          **(write_kwargs or {}))
+        checkpoint['created'] = True
+        save_state(checkpoint_file, checkpoint)
+
+    def read_batches():
+        return _timed(table.batch_iter(batchsize), timings, 'read')
+
+    batches = fan_in([read_batches], max_workers=1, prefetch=queue_size)
+    if key_column is None:
+        batches = _skip_rows(batches, checkpoint['rows'])
+    batches = _counted(_timed(batches, timings, 'wait'), counts)
+    write_seconds = 0
+    for segment in _get_segments(batches, checkpoint_rows):
+        write_start = time.perf_counter()
+        dest.append_table(Table.from_batches(table.schema, iter(segment)),
+                          address, **(write_kwargs or {}))
+        write_seconds += time.perf_counter() - write_start
+        _update_checkpoint(checkpoint, segment, table.schema, key_column)
+        save_state(checkpoint_file, checkpoint)
+    os.remove(checkpoint_file)
+    return TransferStats(
+        counts['rows'], counts['batches'], timings['query'],
+        timings['read'], write_seconds, time.perf_counter() - start)
+
+
+def _load_checkpoint(checkpoint_file, query, address, key_column):
+    checkpoint = load_state(checkpoint_file) or {
+        'query': query, 'address': address, 'key_column': key_column,
+        'created': False, 'rows': 0, 'last_key': None}
+    if (checkpoint['query'], checkpoint['address'],
+            checkpoint['key_column']) != (query, address, key_column):
+        raise ValueError(f'{checkpoint_file} belongs to another transfer')
+    return checkpoint
+
+
+def _get_resumed_table(source, query, key_column, checkpoint, read_kwargs):
+    if key_column is None:
+        return source.get_result_table(query, **read_kwargs)
+    last_key = decode_watermark(checkpoint['last_key'])
+    return source.get_incremental_table(query, key_column, last_key,
+                                        ordered=True, **read_kwargs)
+
+
+def _skip_rows(batches, row_count):
+    for batch in batches:
+        length = get_batch_length(batch)
+        if row_count >= length:
+            row_count -= length
+            continue
+        if row_count:
+            batch = tuple(column[row_count:] for column in batch)
+            row_count = 0
+        yield batch
+
+
+def _get_segments(batches, row_count):
+    segment = []
+    segment_rows = 0
+    for batch in batches:
+        segment.append(batch)
+        segment_rows += get_batch_length(batch)
+        if segment_rows >= row_count:
+            yield segment
+            segment = []
+            segment_rows = 0
+    if segment:
+        yield segment
+
+
+def _update_checkpoint(checkpoint, segment, schema, key_column):
+    checkpoint['rows'] += sum(get_batch_length(batch) for batch in segment)
+    if key_column is not None:
+        key_index = get_column_index(schema, key_column)
+        checkpoint['last_key'] = encode_watermark(segment[-1][key_index][-1])
+
+
+def _timed(iterable, timings, key):
+    iterator = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            timings[key] += time.perf_counter() - start
+        yield item
+
+
+def _counted(batches, counts):
+    for batch in batches:
+        counts['batches'] += 1
+        counts['rows'] += get_batch_length(batch)
+        yield batch
@@ -0,0 +1,168 @@
+from adapters.adapter_abstract import Table
+import datetime
+import decimal
+
+ADAPTER_TYPES = ('STRING', 'INTEGER', 'FLOAT', 'BOOLEAN', 'NUMERIC', 'DATE',
+                 'DATETIME', 'TIMESTAMP', 'TIME')
+
+
+def _parse_boolean(value):
+    value = value.lower()
+    if value in ('true', '1', 't', 'yes'):
+        return True
+    if value in ('false', '0', 'f', 'no'):
+        return False
+    raise ValueError(f'not a boolean: {value!r}')
+
+
+def _parse_timestamp(value):
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def format_duration(value):
+    """ Returns a MySQL TIME value, a duration of up to +-838 hours, as
+    '[-]hh:mm:ss[.ffffff]' string like MySQL prints it """
+    if not isinstance(value, datetime.timedelta):
+        return value
+    sign = '-' if value < datetime.timedelta(0) else ''
+    microseconds = abs(value) // datetime.timedelta(microseconds=1)
+    seconds, microseconds = divmod(microseconds, 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    duration = f'{sign}{hours:02d}:{minutes:02d}:{seconds:02d}'
+    if microseconds:
+        duration += f'.{microseconds:06d}'
+    return duration
+
+
+TEXT_PARSERS = {
+    'INTEGER': int,
+    'FLOAT': float,
+    'BOOLEAN': _parse_boolean,
+    'NUMERIC': decimal.Decimal,
+    'DATE': datetime.date.fromisoformat,
+    'DATETIME': datetime.datetime.fromisoformat,
+    'TIMESTAMP': _parse_timestamp,
+    'TIME': datetime.time.fromisoformat
+}
+
+CONVERSIONS = {
+    ('INTEGER', 'FLOAT'): float,
+    ('INTEGER', 'NUMERIC'): decimal.Decimal,
+    ('INTEGER', 'BOOLEAN'): bool,
+    ('FLOAT', 'NUMERIC'): lambda value: decimal.Decimal(repr(value)),
+    ('FLOAT', 'INTEGER'): int,
+    ('NUMERIC', 'FLOAT'): float,
+    ('NUMERIC', 'INTEGER'): int,
+    ('BOOLEAN', 'INTEGER'): int,
+    ('DATETIME', 'DATE'): datetime.datetime.date,
+    ('TIMESTAMP', 'DATE'): datetime.datetime.date
+}
+
+COMPATIBLE_TYPES = {
+    ('DATETIME', 'TIMESTAMP'),
+    ('TIMESTAMP', 'DATETIME')
+}
+
+
+def get_converter(source_type, dest_type):
+    """ Returns the function converting a value of source_type to dest_type,
+    None if the values need no conversion """
+    if source_type == dest_type or (source_type, dest_type) in COMPATIBLE_TYPES:
+        return None
+    if dest_type == 'STRING':
+        return str
+    if source_type == 'STRING' and dest_type in TEXT_PARSERS:
+        return TEXT_PARSERS[dest_type]
+    if (source_type, dest_type) in CONVERSIONS:
+        return CONVERSIONS[(source_type, dest_type)]
+    raise ValueError(f'cannot convert {source_type} to {dest_type}')
+
+
+def compile_plan(source_schema, dest_schema):
+    """ Returns one converter per column, None for columns that match """
+    return [get_converter(source_type, dest_type)
+            for (_, source_type), (_, dest_type)
+            in zip(source_schema, dest_schema)]
+
+
+def compile_text_plan(schema):
+    """ Returns the plan parsing text columns, e.g. from a CSV file """
+    return [TEXT_PARSERS.get(column_type) for _, column_type in schema]
+
+
+def parse_text_batch(batch, plan):
+    """ Converts a batch of text columns, empty strings of typed columns
+    become None """
+    return tuple(column if parse is None else _parse_text_column(column, parse)
+                 for column, parse in zip(batch, plan))
+
+
+def _parse_text_column(column, parse):
+    try:
+        return list(map(parse, column))
+    except (ValueError, decimal.InvalidOperation):
+        return [None if value == '' else parse(value) for value in column]
+
+
+def convert_row(row, plan):
+    return tuple(value if convert is None or value is None else convert(value)
+                 for value, convert in zip(row, plan))
+
+
+def convert_batch(batch, plan):
+    return tuple(column if convert is None else _convert_column(column, convert)
+                 for column, convert in zip(batch, plan))
+
+
+def _convert_column(column, convert):
+    return [None if value is None else convert(value) for value in column]
+
+
+def convert_table(table, dest_schema):
+    """ Returns table with the columns converted to dest_schema """
+    plan = compile_plan(table.schema, dest_schema)
+    if not any(plan):
+        return Table(dest_schema, table.row_iter)
+    batch_iter = (convert_batch(batch, plan) for batch in table.batch_iter())
+    return Table.from_batches(dest_schema, batch_iter)
+
+
+def get_supported_schema(schema, supported_types):
+    """ Returns schema with unsupported types replaced by STRING """
+    return [(column_name, column_type if column_type in supported_types
+             else 'STRING') for column_name, column_type in schema]
+
+
+def get_arrow_type(adapter_type):
+    import pyarrow
+    arrow_types = {
+        'STRING': pyarrow.string(),
+        'INTEGER': pyarrow.int64(),
+        'FLOAT': pyarrow.float64(),
+        'BOOLEAN': pyarrow.bool_(),
+        'NUMERIC': pyarrow.decimal128(38, 9),
+        'DATE': pyarrow.date32(),
+        'DATETIME': pyarrow.timestamp('us'),
+        'TIMESTAMP': pyarrow.timestamp('us', tz='UTC'),
+        'TIME': pyarrow.time64('us')
+    }
+    return arrow_types.get(adapter_type, pyarrow.string())
+
+
+def get_adapter_type(arrow_type):
+    import pyarrow.types
+    if pyarrow.types.is_timestamp(arrow_type):
+        return 'TIMESTAMP' if arrow_type.tz else 'DATETIME'
+    arrow_checks = [
+        (pyarrow.types.is_boolean, 'BOOLEAN'),
+        (pyarrow.types.is_integer, 'INTEGER'),
+        (pyarrow.types.is_floating, 'FLOAT'),
+        (pyarrow.types.is_decimal, 'NUMERIC'),
+        (pyarrow.types.is_date, 'DATE'),
+        (pyarrow.types.is_time, 'TIME')
+    ]
+    for is_type, adapter_type in arrow_checks:
+        if is_type(arrow_type):
+            return adapter_type
+    return 'STRING'
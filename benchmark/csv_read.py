@@ -0,0 +1,95 @@
+"""Read throughput of AdapterCsv.get_result_table against the former
+row-by-row conversion:
+
+    python -m benchmark.csv_read --rows 1000000
+"""
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import re
+import tempfile
+from collections import defaultdict
+from adapters.adapter_abstract import Table
+from adapters.adapter_csv import AdapterCsv
+from benchmark.utils import measure_rows
+
+COLUMN_TYPES = ['STRING', 'INTEGER', 'FLOAT', 'INTEGER', 'STRING',
+                'FLOAT', 'INTEGER', 'STRING', 'FLOAT', 'INTEGER']
+ADAPTER_TO_PYTHON = {
+    'INTEGER': int,
+    'FLOAT': float,
+    'STRING': str
+}
+COLUMN_VALUES = {
+    'STRING': lambda i: f'value_{i}',
+    'INTEGER': lambda i: i,
+    'FLOAT': lambda i: i * 1.5
+}
+
+
+def get_rows(row_count):
+    values = [COLUMN_VALUES[column_type] for column_type in COLUMN_TYPES]
+    return (tuple(value(i) for value in values) for i in range(row_count))
+
+
+def write_csv(file_name, row_count):
+    schema = [(f'col{i}', t) for i, t in enumerate(COLUMN_TYPES)]
+    with AdapterCsv() as adapter:
+        adapter.create_table(Table(schema, get_rows(row_count)), file_name)
+
+
+def read_row_by_row(file_name):
+    # conversion as done before the per-column converters
+    with open(file_name, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        schema = [tuple(re.findall("'(.+?)'", c)) for c in next(reader)]
+        for row in reader:
+            _, column_types = zip(*schema)
+            converted_row = []
+            for col_nr, item in enumerate(row):
+                convert = defaultdict(str, ADAPTER_TO_PYTHON)
+                converted_row.append(convert[column_types[col_nr]](item))
+            yield tuple(converted_row)
+
+
+def read_adapter(file_name, engine):
+    with AdapterCsv() as adapter:
+        table = adapter.get_result_table(file_name, engine=engine)
+        yield from table.row_iter
+
+
+def read_parallel(file_name, processes):
+    with AdapterCsv() as adapter:
+        table = adapter.get_parallel_result_table(file_name, processes)
+        yield from table.row_iter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--engines', nargs='+',
+                        default=['row_by_row', 'python', 'mmap', 'arrow',
+                                 'parallel'])
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_name = os.path.join(temp_dir, 'benchmark.csv')
+        write_csv(file_name, args.rows)
+        for engine in args.engines:
+            if engine == 'arrow' and not importlib.util.find_spec('pyarrow'):
+                result = {'error': 'pyarrow is not installed'}
+            elif engine == 'row_by_row':
+                result = measure_rows(read_row_by_row(file_name))
+            elif engine == 'parallel':
+                result = measure_rows(read_parallel(file_name, args.processes))
+                result.update(processes=args.processes)
+            else:
+                result = measure_rows(read_adapter(file_name, engine))
+            result.update(engine=engine)
+            print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Read throughput and peak memory of AdapterMysql.get_result_table.
+
+Run one mode per process, peak RSS is measured for the whole process:
+
+    python -m benchmark.mysql_read test/mysql_keys/test_config.pickle
+    python -m benchmark.mysql_read test/mysql_keys/test_config.pickle --stream
+"""
+import argparse
+import json
+import pickle
+from adapters.adapter_mysql import AdapterMysql
+from benchmark.utils import measure_rows
+
+DIGITS = ' UNION ALL '.join(f'SELECT {n} AS n' for n in range(10))
+
+
+def get_default_query(exponent=6):
+    tables = [f'({DIGITS}) AS d{i}' for i in range(exponent)]
+    number = ' + '.join(f'd{i}.n * {10 ** i}' for i in range(exponent))
+    return (f'SELECT {number} AS id, MD5({number}) AS name, '
+            f'({number}) * 1.5 AS value FROM {", ".join(tables)}')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('db_config', help='pickled mysql db_config')
+    parser.add_argument('--query', default=get_default_query())
+    parser.add_argument('--fetchsize', type=int, default=1000)
+    parser.add_argument('--stream', action='store_true')
+    args = parser.parse_args()
+    with open(args.db_config, 'rb') as f:
+        db_config = pickle.load(f)
+    with AdapterMysql(db_config) as adapter:
+        table = adapter.get_result_table(
+            args.query, fetchsize=args.fetchsize, stream=args.stream)
+        result = measure_rows(table.row_iter)
+    result.update(fetchsize=args.fetchsize, stream=args.stream)
+    print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
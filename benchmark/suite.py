@@ -0,0 +1,406 @@
+"""Offline throughput of every read, write and transfer path.
+
+The adapters run against temp files and the in-process fakes from
+test/fakes.py, MySQL optionally against a real server. Each path prints one
+JSON result with rows/s, MB/s, per-batch latency percentiles and peak RSS.
+Every path runs in its own process, so the peak RSS is that of the path
+alone; the synthetic rows are generated on demand rather than held in
+memory (the BigQuery fake still keeps its table in a list, like a server):
+
+    python -m benchmark.suite --rows 100000 --width 10
+    python -m benchmark.suite --types INTEGER STRING DATE --output base.json
+    python -m benchmark.suite --paths read:csv transfer:mysql:csv
+"""
+import argparse
+import contextlib
+import datetime
+import decimal
+import json
+import os
+import pickle
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+from adapters.adapter_abstract import Table, get_batch_length, get_batches
+from adapters.transfer import transfer
+from benchmark.utils import measure_throughput
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test'))
+from fakes import FakeBigqueryClient, FakeMysqlConnection  # noqa: E402
+
+START_DATE = datetime.date(2000, 1, 1)
+START_DATETIME = datetime.datetime(2000, 1, 1)
+
+VALUE_FACTORIES = {
+    'STRING': lambda i, c: f'value_{c}_{i}',
+    'INTEGER': lambda i, c: i * (c + 1),
+    'FLOAT': lambda i, c: i * 1.5 + c,
+    'BOOLEAN': lambda i, c: (i + c) % 2 == 0,
+    'NUMERIC': lambda i, c: decimal.Decimal(i).scaleb(-2),
+    'DATE': lambda i, c: START_DATE + datetime.timedelta(days=i % 36500),
+    'DATETIME': lambda i, c: START_DATETIME + datetime.timedelta(seconds=i),
+    'TIMESTAMP': lambda i, c: (START_DATETIME + datetime.timedelta(seconds=i)
+                               ).replace(tzinfo=datetime.timezone.utc),
+    'TIME': lambda i, c: (START_DATETIME
+                          + datetime.timedelta(seconds=i % 86400)).time()
+}
+
+ADAPTER_TO_MYSQL_FIELD_TYPE = {
+    'STRING': 253,
+    'INTEGER': 8,
+    'FLOAT': 5,
+    'BOOLEAN': 1,
+    'NUMERIC': 246,
+    'DATE': 10,
+    'DATETIME': 12,
+    'TIMESTAMP': 7,
+    'TIME': 11
+}
+
+READS = {
+    'csv': ('csv', {}),
+    'csv_mmap': ('csv', {'engine': 'mmap'}),
+    'csv_arrow': ('csv', {'engine': 'arrow'}),
+    'parquet': ('parquet', {}),
+    'mysql': ('mysql', {}),
+    'mysql_stream': ('mysql', {'stream': True}),
+    'bigquery': ('bigquery', {})
+}
+
+WRITES = {
+    'csv': ('csv', {}),
+    'parquet': ('parquet', {}),
+    'mysql': ('mysql', {}),
+    'mysql_bulk': ('mysql', {'bulk': True}),
+    'mysql_writers': ('mysql', {'writers': 4}),
+    'bigquery': ('bigquery', {}),
+    'bigquery_load': ('bigquery', {'load_job': True})
+}
+
+BACKENDS = ('csv', 'parquet', 'mysql', 'bigquery')
+
+
+def get_schema(width, column_types):
+    return [(f'col{c}', column_types[c % len(column_types)])
+            for c in range(width)]
+
+
+class SyntheticRows:
+    """ Generates the rows of the synthetic table on every iteration """
+
+    def __init__(self, schema, row_count):
+        self.__factories = [(c, VALUE_FACTORIES[column_type])
+                            for c, (_, column_type) in enumerate(schema)]
+        self.__row_count = row_count
+
+    def __len__(self):
+        return self.__row_count
+
+    def __iter__(self):
+        for i in range(self.__row_count):
+            yield tuple(factory(i, c) for c, factory in self.__factories)
+
+
+def get_rows(schema, row_count):
+    return SyntheticRows(schema, row_count)
+
+
+def get_payload_bytes(rows):
+    return sum(len(str(value)) for row in rows for value in row)
+
+
+def get_paths():
+    paths = [f'read:{name}' for name in READS]
+    paths += [f'write:{name}' for name in WRITES]
+    paths += [f'transfer:{source}:{dest}'
+              for source in BACKENDS for dest in BACKENDS]
+    return paths
+
+
+def _timed_batches(batches, latencies):
+    last = time.perf_counter()
+    for batch in batches:
+        yield batch
+        now = time.perf_counter()
+        latencies.append(now - last)
+        last = now
+
+
+def _to_mysql_value(value):
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime.time):
+        return datetime.datetime.combine(START_DATE, value) - \
+            datetime.datetime.combine(START_DATE, datetime.time())
+    return value
+
+
+class _TimedDestination:
+    # times every batch the wrapped adapter pulls while writing
+    def __init__(self, adapter, latencies, **kwargs):
+        self.__adapter = adapter
+        self.__latencies = latencies
+        self.__kwargs = kwargs
+
+    def create_table(self, table, table_adress):
+        batches = _timed_batches(table.batch_iter(), self.__latencies)
+        self.__adapter.create_table(
+            Table.from_batches(table.schema, batches), table_adress,
+            **self.__kwargs)
+
+
+class Backends:
+    """ Opens the adapters of every backend, sources hold the synthetic
+    rows, destinations are removed after use """
+
+    def __init__(self, schema, rows, temp_dir, batchsize, mysql_config=None):
+        self.__schema = schema
+        self.__rows = rows
+        self.__temp_dir = temp_dir
+        self.__batchsize = batchsize
+        self.__mysql_config = mysql_config
+        self.__sources_created = set()
+
+    @contextlib.contextmanager
+    def source(self, backend):
+        with getattr(self, f'_{backend}_source')() as source:
+            yield source
+
+    @contextlib.contextmanager
+    def destination(self, backend):
+        with getattr(self, f'_{backend}_destination')() as destination:
+            yield destination
+
+    def get_table(self):
+        batches = get_batches(iter(self.__rows), self.__batchsize)
+        return Table.from_batches(self.__schema, batches)
+
+    @contextlib.contextmanager
+    def _csv_source(self):
+        from adapters.adapter_csv import AdapterCsv
+        file_name = os.path.join(self.__temp_dir, 'source.csv')
+        with AdapterCsv() as adapter:
+            if 'csv' not in self.__sources_created:
+                adapter.create_table(self.get_table(), file_name)
+                self.__sources_created.add('csv')
+            yield adapter, file_name
+
+    @contextlib.contextmanager
+    def _csv_destination(self):
+        from adapters.adapter_csv import AdapterCsv
+        file_name = os.path.join(self.__temp_dir, 'dest.csv')
+        with AdapterCsv() as adapter:
+            yield adapter, file_name
+            adapter.delete_table(file_name)
+
+    @contextlib.contextmanager
+    def _parquet_source(self):
+        from adapters.adapter_parquet import AdapterParquet
+        file_name = os.path.join(self.__temp_dir, 'source.parquet')
+        with AdapterParquet() as adapter:
+            if 'parquet' not in self.__sources_created:
+                adapter.create_table(self.get_table(), file_name)
+                self.__sources_created.add('parquet')
+            yield adapter, file_name
+
+    @contextlib.contextmanager
+    def _parquet_destination(self):
+        from adapters.adapter_parquet import AdapterParquet
+        file_name = os.path.join(self.__temp_dir, 'dest.parquet')
+        with AdapterParquet() as adapter:
+            yield adapter, file_name
+            adapter.delete_table(file_name)
+
+    @contextlib.contextmanager
+    def _mysql_source(self):
+        with self.__mysql() as adapter:
+            if self.__mysql_config and 'mysql' not in self.__sources_created:
+                adapter.create_table(self.get_table(), 'benchmark_source')
+                self.__sources_created.add('mysql')
+            yield adapter, 'SELECT * FROM benchmark_source'
+
+    @contextlib.contextmanager
+    def _mysql_destination(self):
+        with self.__mysql() as adapter:
+            yield adapter, 'benchmark_dest'
+            if self.__mysql_config:
+                adapter.delete_table('benchmark_dest')
+
+    @contextlib.contextmanager
+    def __mysql(self):
+        from adapters.adapter_mysql import AdapterMysql
+        if self.__mysql_config:
+            with AdapterMysql(self.__mysql_config) as adapter:
+                yield adapter
+            return
+        description = [(column_name, ADAPTER_TO_MYSQL_FIELD_TYPE[t])
+                       for column_name, t in self.__schema]
+        # a server returns BOOLEAN columns as TINYINT, TIME as timedelta
+        convert = any(t in ('BOOLEAN', 'TIME') for _, t in self.__schema)
+
+        def handler(query, params):
+            if query.startswith('SELECT'):
+                if convert:
+                    return description, (
+                        tuple(_to_mysql_value(v) for v in row)
+                        for row in self.__rows)
+                return description, iter(self.__rows)
+            return None, []
+
+        def connect(**db_config):
+            return FakeMysqlConnection(handler)
+
+        with mock.patch('mysql.connector.connect', side_effect=connect):
+            with AdapterMysql({}) as adapter:
+                yield adapter
+
+    @contextlib.contextmanager
+    def _bigquery_source(self):
+        with self.__bigquery() as adapter:
+            yield adapter, 'SELECT * FROM benchmark.source'
+
+    @contextlib.contextmanager
+    def _bigquery_destination(self):
+        with self.__bigquery() as adapter:
+            yield adapter, 'benchmark.dest'
+
+    @contextlib.contextmanager
+    def __bigquery(self):
+        from adapters.adapter_bigquery import AdapterBigquery
+        client = FakeBigqueryClient(schema=self.__schema, rows=self.__rows,
+                                    page_size=self.__batchsize)
+        AdapterBigquery.clear_clients()
+        with mock.patch(
+                'google.cloud.bigquery.Client.from_service_account_json',
+                return_value=client):
+            with AdapterBigquery('fake_key.json') as adapter:
+                yield adapter
+        AdapterBigquery.clear_clients()
+
+
+def run_read(backends, name, payload_bytes):
+    backend, kwargs = READS[name]
+    latencies = []
+    with backends.source(backend) as (adapter, query):
+        start = time.perf_counter()
+        table = adapter.get_result_table(query, **kwargs)
+        row_count = sum(get_batch_length(batch) for batch in
+                        _timed_batches(table.batch_iter(), latencies))
+        seconds = time.perf_counter() - start
+    return measure_throughput(row_count, payload_bytes, seconds, latencies)
+
+
+def run_write(backends, name, payload_bytes, row_count):
+    backend, kwargs = WRITES[name]
+    latencies = []
+    with backends.destination(backend) as (adapter, address):
+        destination = _TimedDestination(adapter, latencies, **kwargs)
+        start = time.perf_counter()
+        destination.create_table(backends.get_table(), address)
+        seconds = time.perf_counter() - start
+    return measure_throughput(row_count, payload_bytes, seconds, latencies)
+
+
+def run_transfer(backends, source_name, dest_name, payload_bytes, batchsize):
+    latencies = []
+    with backends.source(source_name) as (source, query):
+        with backends.destination(dest_name) as (dest, address):
+            stats = transfer(source, query, _TimedDestination(dest, latencies),
+                             address, batchsize=batchsize)
+    result = measure_throughput(
+        stats.rows, payload_bytes, stats.wall_seconds, latencies)
+    result.update(query_seconds=round(stats.query_seconds, 3),
+                  read_seconds=round(stats.read_seconds, 3),
+                  write_seconds=round(stats.write_seconds, 3))
+    return result
+
+
+def run_path(backends, path, payload_bytes, row_count, batchsize):
+    kind, *names = path.split(':')
+    try:
+        if kind == 'read':
+            return run_read(backends, *names, payload_bytes)
+        if kind == 'write':
+            return run_write(backends, *names, payload_bytes, row_count)
+        return run_transfer(backends, *names, payload_bytes, batchsize)
+    except ImportError as exc:
+        return {'error': f'{exc.name or exc} is not installed'}
+    except Exception as exc:
+        return {'error': f'{type(exc).__name__}: {exc}'}
+
+
+def run_isolated(path, argv):
+    """ Returns the result of `path` run in a fresh interpreter """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    completed = subprocess.run(
+        [sys.executable, '-m', 'benchmark.suite', '--child', path] + argv,
+        cwd=root, capture_output=True, text=True)
+    if completed.returncode:
+        lines = completed.stderr.strip().splitlines() or ['no output']
+        return {'error': f'exit code {completed.returncode}: {lines[-1]}'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_child(args, schema, mysql_config):
+    rows = get_rows(schema, args.rows)
+    payload_bytes = get_payload_bytes(rows)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        backends = Backends(schema, rows, temp_dir, args.batchsize,
+                            mysql_config)
+        result = run_path(backends, args.child, payload_bytes, args.rows,
+                          args.batchsize)
+    print(json.dumps(result), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--width', type=int, default=10)
+    parser.add_argument('--types', nargs='+',
+                        default=['INTEGER', 'FLOAT', 'STRING'],
+                        choices=sorted(VALUE_FACTORIES))
+    parser.add_argument('--batchsize', type=int, default=1000)
+    parser.add_argument('--paths', nargs='+', default=get_paths(),
+                        choices=get_paths())
+    parser.add_argument('--mysql-config',
+                        help='pickled db_config of a MySQL server to use '
+                             'instead of the fake connector')
+    parser.add_argument('--output', help='also write all results as JSON')
+    parser.add_argument('--child', choices=get_paths(),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    mysql_config = None
+    if args.mysql_config:
+        with open(args.mysql_config, 'rb') as f:
+            mysql_config = pickle.load(f)
+    schema = get_schema(args.width, args.types)
+    if args.child:
+        run_child(args, schema, mysql_config)
+        return
+    payload_bytes = get_payload_bytes(get_rows(schema, args.rows))
+    argv = ['--rows', str(args.rows), '--width', str(args.width),
+            '--batchsize', str(args.batchsize), '--types', *args.types]
+    if args.mysql_config:
+        argv += ['--mysql-config', os.path.abspath(args.mysql_config)]
+    results = []
+    for path in args.paths:
+        result = {'path': path}
+        result.update(run_isolated(path, argv))
+        print(json.dumps(result), flush=True)
+        results.append(result)
+    if args.output:
+        config = {'rows': args.rows, 'width': args.width, 'types': args.types,
+                  'batchsize': args.batchsize,
+                  'payload_mb': round(payload_bytes / 2 ** 20, 2),
+                  'mysql': 'server' if mysql_config else 'fake',
+                  'python': platform.python_version()}
+        with open(args.output, 'w') as f:
+            json.dump({'config': config, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
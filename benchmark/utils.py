@@ -0,0 +1,47 @@
+import resource
+import sys
+import time
+
+
+def get_peak_rss_mb():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    if sys.platform == 'darwin':
+        return peak_rss / 2 ** 20
+    return peak_rss / 2 ** 10
+
+
+def measure_rows(row_iter):
+    start = time.perf_counter()
+    row_count = 0
+    for _ in row_iter:
+        row_count += 1
+    seconds = time.perf_counter() - start
+    return {
+        'rows': row_count,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(row_count / seconds) if seconds else None,
+        'peak_rss_mb': round(get_peak_rss_mb(), 1)
+    }
+
+
+def get_latency_percentiles(latencies, percentiles=(50, 95, 99)):
+    if not latencies:
+        return {}
+    latencies = sorted(latencies)
+    return {f'p{p}': round(
+                latencies[min(len(latencies) - 1, len(latencies) * p // 100)]
+                * 1000, 3)
+            for p in percentiles}
+
+
+def measure_throughput(row_count, payload_bytes, seconds, latencies):
+    return {
+        'rows': row_count,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(row_count / seconds) if seconds else None,
+        'mb_per_second':
+            round(payload_bytes / 2 ** 20 / seconds, 2) if seconds else None,
+        'batch_latency_ms': get_latency_percentiles(latencies),
+        'peak_rss_mb': round(get_peak_rss_mb(), 1)
+    }
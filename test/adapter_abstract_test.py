@@ -0,0 +1,45 @@
+import unittest
+from adapters.adapter_abstract import Table
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER')]
+ROWS = [('value1_row1', 1), ('value1_row2', 2), ('value1_row3', 3)]
+BATCHES = [(['value1_row1', 'value1_row2'], [1, 2]), (['value1_row3'], [3])]
+
+
+class TestTable(unittest.TestCase):
+    def test_batch_iter_from_rows(self):
+        table = Table(SCHEMA, iter(ROWS))
+        self.assertEqual(list(table.batch_iter(2)), BATCHES)
+
+    def test_batch_iter_from_row_list(self):
+        table = Table(SCHEMA, ROWS)
+        self.assertEqual(list(table.batch_iter(2)), BATCHES)
+
+    def test_row_iter_from_batches(self):
+        table = Table.from_batches(SCHEMA, iter(BATCHES))
+        self.assertEqual(list(table.row_iter), ROWS)
+
+    def test_batch_iter_from_batches_splits_large_batches(self):
+        table = Table.from_batches(SCHEMA, iter(BATCHES))
+        self.assertEqual(list(table.batch_iter(1)),
+                         [(['value1_row1'], [1]), (['value1_row2'], [2]),
+                          (['value1_row3'], [3])])
+
+    def test_batch_iter_from_batches_merges_small_batches(self):
+        batches = [(['a'], [1]), ([], []), (['b', 'c', 'd'], [2, 3, 4]),
+                   (['e'], [5])]
+        table = Table.from_batches(SCHEMA, iter(batches))
+        self.assertEqual(list(table.batch_iter(2)),
+                         [(['a', 'b'], [1, 2]), (['c', 'd'], [3, 4]),
+                          (['e'], [5])])
+
+    def test_batch_iter_from_batches_keeps_full_batches(self):
+        table = Table.from_batches(SCHEMA, iter(BATCHES))
+        batches = list(table.batch_iter(2))
+        self.assertIs(batches[0], BATCHES[0])
+
+    def test_batch_iter_after_partial_row_iter(self):
+        table = Table.from_batches(SCHEMA, iter(BATCHES))
+        self.assertEqual(next(table.row_iter), ROWS[0])
+        self.assertEqual(list(table.batch_iter()),
+                         [(['value1_row2'], [2]), (['value1_row3'], [3])])
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from fakes import FakeAiomysqlConnection
+from adapters.adapter_abstract import AdapterAbstract, Table
+from adapters.adapter_async_abstract import AsyncAdapterExecutor
+from adapters.adapter_async_csv import AsyncAdapterCsv
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER'), ('test3', 'FLOAT')]
+ROWS = [(f'value{i}', i, i * 1.5) for i in range(25)]
+
+
+class SlowAdapter(AdapterAbstract):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def get_result_table(self, query):
+        time.sleep(self.delay)
+        return Table(SCHEMA, iter(ROWS))
+
+    def create_table(self, table, table_adress):
+        time.sleep(self.delay)
+        self.rows = list(table.row_iter)
+
+    def delete_table(self, table_adress):
+        pass
+
+
+async def collect(async_iter):
+    return [item async for item in async_iter]
+
+
+class TestAsyncAdapterCsv(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, 'temp.csv')
+        self.copy_name = os.path.join(self.temp_dir.name, 'copy.csv')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    async def copy_table(self):
+        async with AsyncAdapterCsv() as adapter:
+            await adapter.create_table(Table(SCHEMA, iter(ROWS)),
+                                       self.file_name)
+            table = await adapter.get_result_table(self.file_name)
+            await adapter.create_table(table, self.copy_name, batchsize=10)
+            table = await adapter.get_result_table(self.copy_name)
+            return table.schema, await collect(table.row_iter)
+
+    def test_copy_table(self):
+        schema, rows = asyncio.run(self.copy_table())
+        self.assertEqual(schema, SCHEMA)
+        self.assertEqual(rows, ROWS)
+
+    async def read_batches(self):
+        async with AsyncAdapterCsv() as adapter:
+            await adapter.create_table(Table(SCHEMA, iter(ROWS)),
+                                       self.file_name)
+            table = await adapter.get_result_table(self.file_name)
+            return await collect(table.batch_iter(10))
+
+    def test_batch_iter(self):
+        batches = asyncio.run(self.read_batches())
+        self.assertEqual([len(batch[0]) for batch in batches], [10, 10, 5])
+
+
+class TestAsyncAdapterExecutor(unittest.TestCase):
+    async def copy(self, source, dest):
+        async with source, dest:
+            table = await source.get_result_table('query')
+            await dest.create_table(table, 'table')
+
+    async def copy_concurrently(self, count):
+        dests = [SlowAdapter(0.05) for _ in range(count)]
+        await asyncio.gather(*[
+            self.copy(AsyncAdapterExecutor(SlowAdapter(0.05)),
+                      AsyncAdapterExecutor(dest)) for dest in dests])
+        return dests
+
+    def test_concurrent_transfers(self):
+        start = time.perf_counter()
+        dests = asyncio.run(self.copy_concurrently(4))
+        self.assertLess(time.perf_counter() - start, 0.3)
+        for dest in dests:
+            self.assertEqual(dest.rows, ROWS)
+
+
+class TestAsyncAdapterMysql(unittest.TestCase):
+    def handler(self, query, params):
+        description = [('test1', 253), ('test2', 3), ('test3', 5)]
+        return description, ROWS
+
+    async def copy_table(self, source, dest):
+        from adapters.adapter_async_mysql import AsyncAdapterMysql
+        connect = mock.AsyncMock(side_effect=[source, dest])
+        with mock.patch('aiomysql.connect', connect):
+            async with AsyncAdapterMysql({'database': 'test'}) as adapter, \
+                    AsyncAdapterMysql({'database': 'test'}) as adapter_dest:
+                table = await adapter.get_result_table('SELECT 1', 10)
+                await adapter_dest.create_table(table, 'test_writing', 10)
+                schema = table.schema
+        return schema, connect.call_args
+
+    def test_copy_table(self):
+        source = FakeAiomysqlConnection(self.handler)
+        dest = FakeAiomysqlConnection()
+        schema, call_args = asyncio.run(self.copy_table(source, dest))
+        self.assertEqual(call_args.kwargs, {'db': 'test'})
+        self.assertEqual(schema, SCHEMA)
+        self.assertEqual(dest.inserted, ROWS)
+        self.assertEqual(dest.commits, 1)
@@ -0,0 +1,165 @@
+import gzip
+import os
+import json
+import tempfile
+import time
+import unittest
+from unittest import mock
+from fakes import FakeBigqueryClient, FakeBigqueryReadClient
+from adapters.adapter_abstract import Table
+from adapters.adapter_bigquery import AdapterBigquery
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER'), ('test3', 'FLOAT')]
+ROWS = [(f'value{i}', i, i * 1.1) for i in range(25)]
+
+
+class BigqueryTestCase(unittest.TestCase):
+    def setUp(self):
+        AdapterBigquery.clear_clients()
+
+    def get_adapter(self, client):
+        patcher = mock.patch(
+            'google.cloud.bigquery.Client.from_service_account_json',
+            return_value=client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return AdapterBigquery('fake_key.json')
+
+
+class TestAdapterBigqueryLoadJob(BigqueryTestCase):
+    def test_create_table_load_job_json(self):
+        client = FakeBigqueryClient()
+        with self.get_adapter(client) as adapter:
+            adapter.create_table(Table(SCHEMA, iter(ROWS)), 'dataset.table',
+                                 load_job=True, load_chunksize=10)
+        self.assertEqual(len(client.loads), 3)
+        self.assertEqual(client.inserted, [])
+        rows = []
+        for payload, job_config in client.loads:
+            self.assertEqual(job_config.source_format, 'NEWLINE_DELIMITED_JSON')
+            self.assertEqual(job_config.write_disposition, 'WRITE_APPEND')
+            lines = gzip.decompress(payload).decode('utf-8').splitlines()
+            rows.extend(json.loads(line) for line in lines)
+        rows.sort(key=lambda row: row['test2'])
+        self.assertEqual([tuple(row.values()) for row in rows], ROWS)
+
+    def test_create_table_load_job_merges_source_batches(self):
+        client = FakeBigqueryClient()
+        batches = [(['a'] * 5, list(range(5)), [1.0] * 5)] * 5
+        with self.get_adapter(client) as adapter:
+            adapter.create_table(Table.from_batches(SCHEMA, iter(batches)),
+                                 'dataset.table', load_job=True,
+                                 load_chunksize=100)
+        self.assertEqual(len(client.loads), 1)
+
+    def test_create_table_load_job_sequential_keeps_chunk_order(self):
+        client = FakeBigqueryClient()
+        with self.get_adapter(client) as adapter:
+            adapter.create_table(Table(SCHEMA, iter(ROWS)), 'dataset.table',
+                                 load_job=True, load_chunksize=20,
+                                 max_workers=1)
+        first_rows = [gzip.decompress(payload).splitlines()[0]
+                      for payload, _ in client.loads]
+        self.assertEqual([json.loads(row)['test2'] for row in first_rows],
+                         [0, 20])
+
+    def test_create_table_streaming_insert(self):
+        client = FakeBigqueryClient()
+        with self.get_adapter(client) as adapter:
+            adapter.create_table(Table(SCHEMA, iter(ROWS)), 'dataset.table')
+        self.assertEqual(client.inserted, ROWS)
+        self.assertEqual(client.loads, [])
+
+    def test_load_file(self):
+        client = FakeBigqueryClient()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'table.parquet')
+            with open(file_name, 'wb') as f:
+                f.write(b'PAR1 data')
+            with self.get_adapter(client) as adapter:
+                adapter.load_file(file_name, 'dataset.table')
+        (payload, job_config), = client.loads
+        self.assertEqual(payload, b'PAR1 data')
+        self.assertEqual(job_config.source_format, 'PARQUET')
+        self.assertEqual(job_config.write_disposition, 'WRITE_APPEND')
+
+
+class TestAdapterBigqueryReadStreams(BigqueryTestCase):
+    def setUp(self):
+        super().setUp()
+        rows = [dict(zip(('test1', 'test2', 'test3'), row)) for row in ROWS]
+        streams = [[rows[0:5], rows[5:10]], [rows[10:20]], [rows[20:25]]]
+        self.read_client = FakeBigqueryReadClient(streams, delay=0.05)
+        self.client = FakeBigqueryClient(schema=SCHEMA, rows=ROWS)
+
+    def get_result_table(self, **kwargs):
+        adapter = self.get_adapter(self.client)
+        with mock.patch('google.cloud.bigquery_storage.BigQueryReadClient'
+                        '.from_service_account_json',
+                        return_value=self.read_client):
+            return adapter.get_result_table('SELECT 1', **kwargs)
+
+    def test_get_result_table_read_streams_ordered(self):
+        table = self.get_result_table(read_streams=3)
+        self.assertEqual(table.schema, SCHEMA)
+        self.assertEqual(list(table.row_iter), ROWS)
+        parent, session, max_stream_count = self.read_client.sessions[0]
+        self.assertEqual(parent, 'projects/fake-project')
+        self.assertEqual(session.table, 'projects/fake-project/datasets/'
+                                        '_anon/tables/query_result')
+        self.assertEqual(max_stream_count, 3)
+
+    def test_get_result_table_read_streams_unordered(self):
+        table = self.get_result_table(read_streams=3, ordered=False)
+        self.assertEqual(sorted(table.row_iter, key=lambda row: row[1]), ROWS)
+
+    def test_get_result_table_read_streams_in_parallel(self):
+        start = time.perf_counter()
+        list(self.get_result_table(read_streams=3).row_iter)
+        self.assertLess(time.perf_counter() - start, 0.14)
+
+
+class TestAdapterBigqueryRead(BigqueryTestCase):
+    def test_get_result_table_batches_pages(self):
+        client = FakeBigqueryClient(schema=SCHEMA, rows=ROWS)
+        with self.get_adapter(client) as adapter:
+            table = adapter.get_result_table('SELECT 1')
+            self.assertEqual(table.schema, SCHEMA)
+            batches = list(table.batch_iter())
+        self.assertEqual([len(batch[0]) for batch in batches], [10, 10, 5])
+        self.assertEqual(batches[1][0], [f'value{i}' for i in range(10, 20)])
+
+
+class TestAdapterBigqueryClientCache(BigqueryTestCase):
+    def test_client_is_created_lazily_and_shared(self):
+        with mock.patch(
+                'google.cloud.bigquery.Client.from_service_account_json',
+                return_value=FakeBigqueryClient()) as from_json:
+            adapters = [AdapterBigquery('fake_key.json') for _ in range(3)]
+            from_json.assert_not_called()
+            for adapter in adapters:
+                adapter.get_result_table('SELECT 1')
+        from_json.assert_called_once_with(os.path.abspath('fake_key.json'))
+
+
+class TestAdapterBigqueryIncremental(BigqueryTestCase):
+    def test_get_incremental_table(self):
+        client = FakeBigqueryClient(schema=SCHEMA, rows=ROWS)
+        with self.get_adapter(client) as adapter:
+            adapter.get_incremental_table('SELECT * FROM dataset.table',
+                                          'test2', 5)
+        query, job_config = client.queries[0]
+        self.assertEqual(query, 'SELECT * FROM (SELECT * FROM dataset.table) '
+                                'AS incremental WHERE test2 > @watermark')
+        parameter, = job_config.query_parameters
+        self.assertEqual((parameter.name, parameter.type_, parameter.value),
+                         ('watermark', 'INT64', 5))
+
+    def test_append_table(self):
+        client = FakeBigqueryClient()
+        with self.get_adapter(client) as adapter:
+            adapter.create_table(Table(SCHEMA, iter(ROWS[:5])),
+                                 'dataset.table')
+            adapter.append_table(Table(SCHEMA, iter(ROWS[5:])),
+                                 'dataset.table')
+        self.assertEqual(client.inserted, ROWS)
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import time
+import unittest
+from adapters.adapter_abstract import AdapterAbstract, Table
+from adapters.adapter_cache import AdapterCache
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER'), ('test3', 'FLOAT')]
+ROWS = [(f'value{i}', i, i * 1.5) for i in range(2500)]
+
+
+class CountingAdapter(AdapterAbstract):
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+
+    def get_result_table(self, query, schema=SCHEMA, rows=ROWS):
+        self.queries.append(query)
+        return Table(schema, iter(rows))
+
+    def create_table(self, table, table_adress):
+        pass
+
+    def delete_table(self, table_adress):
+        pass
+
+
+class TestAdapterCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.adapter = CountingAdapter()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def get_cache(self, **kwargs):
+        return AdapterCache(self.adapter, self.temp_dir.name, **kwargs)
+
+    def read(self, cache, query):
+        table = cache.get_result_table(query)
+        return table.schema, list(table.row_iter)
+
+    def test_hit_after_complete_read(self):
+        with self.get_cache() as cache:
+            self.assertEqual(self.read(cache, 'SELECT *\n FROM t;'),
+                             (SCHEMA, ROWS))
+            self.assertEqual(self.read(cache, 'SELECT * FROM t'),
+                             (SCHEMA, ROWS))
+        self.assertEqual(len(self.adapter.queries), 1)
+
+    def test_partial_read_is_not_cached(self):
+        with self.get_cache() as cache:
+            table = cache.get_result_table('SELECT * FROM t')
+            next(table.row_iter)
+            del table
+            self.read(cache, 'SELECT * FROM t')
+        self.assertEqual(len(self.adapter.queries), 2)
+        self.assertEqual(len(os.listdir(self.temp_dir.name)), 1)
+
+    def test_ttl(self):
+        with self.get_cache(ttl=0.01) as cache:
+            self.read(cache, 'SELECT * FROM t')
+            time.sleep(0.02)
+            self.assertEqual(self.read(cache, 'SELECT * FROM t'),
+                             (SCHEMA, ROWS))
+        self.assertEqual(len(self.adapter.queries), 2)
+
+    def test_lru_eviction(self):
+        with self.get_cache() as cache:
+            self.read(cache, 'SELECT 1')
+        entry_size = os.path.getsize(
+            os.path.join(self.temp_dir.name, os.listdir(self.temp_dir.name)[0]))
+        with self.get_cache(max_bytes=2.5 * entry_size) as cache:
+            self.read(cache, 'SELECT 2')
+            time.sleep(0.01)
+            self.read(cache, 'SELECT 1')
+            time.sleep(0.01)
+            self.read(cache, 'SELECT 3')
+            self.assertEqual(len(os.listdir(self.temp_dir.name)), 2)
+            self.read(cache, 'SELECT 1')
+            self.read(cache, 'SELECT 2')
+        self.assertEqual(self.adapter.queries,
+                         ['SELECT 1', 'SELECT 2', 'SELECT 3', 'SELECT 2'])
+
+    def test_truncated_entry_is_a_miss(self):
+        with self.get_cache() as cache:
+            self.read(cache, 'SELECT * FROM t')
+            file_name = os.path.join(self.temp_dir.name,
+                                     os.listdir(self.temp_dir.name)[0])
+            with open(file_name, 'r+b') as f:
+                f.truncate(os.path.getsize(file_name) // 2)
+            self.assertEqual(self.read(cache, 'SELECT * FROM t'),
+                             (SCHEMA, ROWS))
+        self.assertEqual(len(self.adapter.queries), 2)
+        self.assertEqual(cache.metrics.get_total('cache_hits'), 0)
+        self.assertEqual(cache.metrics.get_total('cache_misses'), 2)
+
+    def test_values_arrow_cant_hold_are_not_cached(self):
+        for schema, rows in (([('a', 'RECORD')], [({'b': 1},)]),
+                             ([('a', 'STRING')], [('b',), ({'b': 1},)])):
+            with self.get_cache() as cache:
+                table = cache.get_result_table('SELECT a', schema=schema,
+                                               rows=rows)
+                self.assertEqual(list(table.row_iter), rows)
+            self.assertEqual(os.listdir(self.temp_dir.name), [])
@@ -0,0 +1,137 @@
+import datetime
+import decimal
+import os
+import tempfile
+import unittest
+from adapters.adapter_abstract import Table
+from adapters.adapter_csv import AdapterCsv
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER'), ('test3', 'FLOAT')]
+ROWS = [(f'value{i}', i, i * 1.5) for i in range(25)]
+
+
+class TestAdapterCsvLocal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, 'temp.csv')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_table(self, rows=ROWS, **kwargs):
+        with AdapterCsv() as adapter:
+            adapter.create_table(Table(SCHEMA, iter(rows)), self.file_name,
+                                 **kwargs)
+
+    def test_batch_iter(self):
+        self.create_table()
+        with AdapterCsv() as adapter:
+            table = adapter.get_result_table(self.file_name, chunksize=10)
+            batches = list(table.batch_iter())
+        self.assertEqual([len(batch[0]) for batch in batches], [10, 10, 5])
+        self.assertEqual(batches[0][1], list(range(10)))
+        self.assertEqual(batches[2][2], [i * 1.5 for i in range(20, 25)])
+
+    def test_create_table_from_batches(self):
+        batches = [(['a', 'b'], [1, 2], [0.5, 1.5]), (['c'], [3], [2.5])]
+        with AdapterCsv() as adapter:
+            adapter.create_table(Table.from_batches(SCHEMA, iter(batches)),
+                                 self.file_name)
+            table = adapter.get_result_table(self.file_name)
+            self.assertEqual(table.schema, SCHEMA)
+            self.assertEqual(list(table.row_iter),
+                             [('a', 1, 0.5), ('b', 2, 1.5), ('c', 3, 2.5)])
+
+    def test_get_result_table_mmap(self):
+        self.create_table()
+        with AdapterCsv() as adapter:
+            table = adapter.get_result_table(self.file_name, engine='mmap')
+            self.assertEqual(table.schema, SCHEMA)
+            self.assertEqual(list(table.row_iter), ROWS)
+
+    def test_get_result_table_mmap_quoted_newlines(self):
+        rows = [('line\nbreak', 1, 1.5), ('carriage\r\nreturn', 2, 2.5)]
+        self.create_table(rows)
+        with AdapterCsv() as adapter:
+            table = adapter.get_result_table(self.file_name, engine='mmap')
+            self.assertEqual(list(table.row_iter), rows)
+
+    def test_get_row_offsets(self):
+        rows = [('a', 1, 1.5), ('multi\nline', 2, 2.5), ('c', 3, 3.5)]
+        self.create_table(rows)
+        with AdapterCsv() as adapter:
+            offsets = adapter.get_row_offsets(self.file_name)
+        with open(self.file_name, 'rb') as csvfile:
+            content = csvfile.read()
+        self.assertEqual(len(offsets), 3)
+        self.assertTrue(content[offsets[0]:].startswith(b'a,1,1.5'))
+        self.assertTrue(content[offsets[1]:].startswith(b'"multi\nline",2'))
+        self.assertTrue(content[offsets[2]:].startswith(b'c,3,3.5'))
+
+    def test_get_parallel_result_table_ordered(self):
+        self.create_table()
+        with AdapterCsv() as adapter:
+            table = adapter.get_parallel_result_table(
+                self.file_name, processes=2, range_size=64)
+            self.assertEqual(table.schema, SCHEMA)
+            self.assertEqual(list(table.row_iter), ROWS)
+
+    def test_get_parallel_result_table_unordered(self):
+        self.create_table()
+        with AdapterCsv() as adapter:
+            table = adapter.get_parallel_result_table(
+                self.file_name, processes=2, ordered=False, range_size=64)
+            rows = sorted(table.row_iter, key=lambda row: row[1])
+        self.assertEqual(rows, ROWS)
+
+    def test_get_parallel_result_table_row_offsets(self):
+        rows = [(f'multi\nline{i}', i, i * 1.5) for i in range(25)]
+        self.create_table(rows)
+        with AdapterCsv() as adapter:
+            row_offsets = adapter.get_row_offsets(self.file_name)
+            table = adapter.get_parallel_result_table(
+                self.file_name, processes=2, row_offsets=row_offsets,
+                range_size=50)
+            self.assertEqual(list(table.row_iter), rows)
+
+    def test_create_table_gzip(self):
+        self.file_name += '.gz'
+        self.create_table()
+        with open(self.file_name, 'rb') as csvfile:
+            self.assertEqual(csvfile.read(2), b'\x1f\x8b')
+        with AdapterCsv() as adapter:
+            table = adapter.get_result_table(self.file_name)
+            self.assertEqual(table.schema, SCHEMA)
+            self.assertEqual(list(table.row_iter), ROWS)
+
+    def test_create_table_compression_argument(self):
+        self.create_table(compression='gzip')
+        with AdapterCsv() as adapter:
+            table = adapter.get_result_table(self.file_name,
+                                             compression='gzip')
+            self.assertEqual(list(table.row_iter), ROWS)
+            with self.assertRaises(ValueError):
+                adapter.get_result_table(self.file_name + '.gz', engine='mmap')
+
+    def test_typed_columns_roundtrip(self):
+        schema = [('flag', 'BOOLEAN'), ('price', 'NUMERIC'), ('day', 'DATE')]
+        rows = [(True, decimal.Decimal('1.10'), datetime.date(2020, 1, 2)),
+                (False, None, None)]
+        with AdapterCsv() as adapter:
+            adapter.create_table(Table(schema, iter(rows)), self.file_name)
+            for engine in ('python', 'mmap'):
+                table = adapter.get_result_table(self.file_name, engine=engine)
+                self.assertEqual(table.schema, schema)
+                self.assertEqual(list(table.row_iter), rows)
+
+    def test_get_incremental_table_ordered_null_first(self):
+        rows = [('b', 2, 1.0), ('null', None, 2.0), ('a', 1, 3.0)]
+        self.create_table(rows)
+        with AdapterCsv() as adapter:
+            table = adapter.get_incremental_table(
+                self.file_name, 'test2', None, ordered=True)
+            self.assertEqual(list(table.row_iter),
+                             [rows[1], rows[2], rows[0]])
+            table = adapter.get_incremental_table(
+                self.file_name, 'test2', 1, ordered=True)
+            self.assertEqual(list(table.row_iter), [rows[0]])
@@ -0,0 +1,415 @@
+import datetime
+import decimal
+import os
+import tempfile
+import unittest
+from unittest import mock
+from fakes import FakeMysqlConnection
+from adapters.adapter_abstract import Table
+from adapters.connection_pool import ConnectionPool
+from adapters.adapter_mysql import AdapterMysql
+from adapters.adapter_parquet import AdapterParquet
+from adapters.transfer import transfer
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER'), ('test3', 'FLOAT')]
+ROWS = [(f'value{i}', i, i * 1.1) for i in range(25)]
+
+
+class TestAdapterMysqlBatchedInsert(unittest.TestCase):
+    def test_create_table_batches_rows(self):
+        connection = FakeMysqlConnection()
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                table = Table(SCHEMA, iter(ROWS))
+                adapter.create_table(table, 'test_writing', chunksize=10)
+        inserts = connection.statements[1:]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(inserts[0][0],
+                         'INSERT INTO test_writing VALUES (%s, %s, %s)')
+        self.assertEqual(connection.inserted, ROWS)
+        self.assertEqual(connection.commits, 1)
+        self.assertGreater(adapter.rows_per_second, 0)
+
+    def test_create_table_commit_every(self):
+        connection = FakeMysqlConnection()
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                table = Table(SCHEMA, iter(ROWS))
+                adapter.create_table(table, 'test_writing',
+                                     chunksize=5, commit_every=2)
+        self.assertEqual(connection.commits, 3)
+
+
+class TestAdapterMysqlBulkLoad(unittest.TestCase):
+    def setUp(self):
+        self.loaded_lines = []
+
+    def handler(self, query, params):
+        if query.startswith('LOAD DATA LOCAL INFILE'):
+            with open(params[0], encoding='utf-8') as tsv:
+                self.loaded_lines.extend(tsv.read().splitlines())
+        return None, []
+
+    def create_table(self, rows, **kwargs):
+        connection = FakeMysqlConnection(self.handler)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                adapter.create_table(Table(SCHEMA, iter(rows)),
+                                     'test_writing', **kwargs)
+        return connection
+
+    def test_create_table_bulk_writes_tsv_chunks(self):
+        connection = self.create_table(ROWS, bulk=True, bulk_chunksize=10)
+        loads = connection.statements[1:]
+        self.assertEqual(len(loads), 3)
+        self.assertIn('INTO TABLE test_writing', loads[0][0])
+        self.assertEqual(self.loaded_lines[1], 'value1\t1\t1.1')
+        self.assertEqual(len(self.loaded_lines), len(ROWS))
+
+    def test_create_table_bulk_merges_source_batches(self):
+        batches = [tuple(map(list, zip(*ROWS[i:i + 5])))
+                   for i in range(0, 25, 5)]
+        connection = FakeMysqlConnection(self.handler)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                adapter.create_table(Table.from_batches(SCHEMA, iter(batches)),
+                                     'test_writing', bulk=True)
+        self.assertEqual(len(connection.statements), 2)
+        self.assertEqual(len(self.loaded_lines), len(ROWS))
+
+    def test_create_table_bulk_escapes_values(self):
+        rows = [('tab\there', None, 1.0), ('new\nline\\', 2, None)]
+        self.create_table(rows, bulk=True)
+        self.assertEqual(self.loaded_lines,
+                         ['tab\\there\t\\N\t1.0', 'new\\nline\\\\\t2\t\\N'])
+
+    def test_bulk_needs_fewer_round_trips_than_row_by_row(self):
+        row_by_row = self.create_table(ROWS, chunksize=1)
+        bulk = self.create_table(ROWS, bulk=True)
+        self.assertEqual(row_by_row.round_trips, len(ROWS) + 1)
+        self.assertEqual(bulk.round_trips, 2)
+
+
+class TestAdapterMysqlStreamingRead(unittest.TestCase):
+    def handler(self, query, params):
+        description = [('test1', 253), ('test2', 3), ('test3', 5)]
+        return description, ROWS
+
+    def test_get_result_table_stream(self):
+        connection = FakeMysqlConnection(self.handler)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                table = adapter.get_result_table(
+                    'SELECT * FROM test_table', fetchsize=10, stream=True)
+                self.assertEqual(table.schema, SCHEMA)
+                self.assertEqual(list(table.row_iter), ROWS)
+        stream_cursor, kwargs = connection.cursors[-1]
+        self.assertEqual(kwargs, {'buffered': False})
+        self.assertTrue(stream_cursor.closed)
+        self.assertEqual(connection.fetches, 4)
+
+    def read_first_batch(self, stream):
+        produced = []
+
+        def handler(query, params):
+            description = [('test1', 253), ('test2', 3), ('test3', 5)]
+            return description, (produced.append(row) or row for row in ROWS)
+
+        connection = FakeMysqlConnection(handler, buffered=True)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({'buffered': True}) as adapter:
+                table = adapter.get_result_table(
+                    'SELECT * FROM test_table', fetchsize=10, stream=stream)
+                batches = table.batch_iter()
+                next(batches)
+                produced_rows = len(produced)
+                list(batches)
+        return produced_rows
+
+    def test_stream_overrides_buffered_config(self):
+        self.assertEqual(self.read_first_batch(stream=False), len(ROWS))
+        self.assertEqual(self.read_first_batch(stream=True), 10)
+
+
+class TestAdapterMysqlPool(unittest.TestCase):
+    def tearDown(self):
+        ConnectionPool.close_all()
+
+    def test_adapters_share_pooled_connection(self):
+        connect = mock.Mock(side_effect=lambda **config: FakeMysqlConnection())
+        with mock.patch('mysql.connector.connect', connect):
+            for _ in range(3):
+                with AdapterMysql({'user': 'test'}, pool_size=2) as adapter:
+                    adapter.delete_table('test_writing')
+        self.assertEqual(connect.call_count, 1)
+        connect.assert_called_with(user='test')
+
+    def write_parallel(self, pool_size, writers, **kwargs):
+        connect = mock.Mock(side_effect=lambda **config: FakeMysqlConnection())
+        with mock.patch('mysql.connector.connect', connect):
+            with AdapterMysql({'user': 'test'}, pool_size=pool_size,
+                              **kwargs) as adapter:
+                adapter.create_table(Table(SCHEMA, iter(ROWS)),
+                                     'test_writing', chunksize=5,
+                                     writers=writers)
+        return connect
+
+    def test_parallel_writers_share_pool(self):
+        connect = self.write_parallel(pool_size=3, writers=2)
+        self.assertEqual(connect.call_count, 3)
+
+    def test_parallel_writers_need_free_pool_slots(self):
+        with self.assertRaises(ValueError):
+            self.write_parallel(pool_size=1, writers=2)
+
+    def test_parallel_writers_time_out_on_used_up_pool(self):
+        pool = ConnectionPool.get_pool({'user': 'test'}, FakeMysqlConnection,
+                                       size=3)
+        connections = [pool.acquire(), pool.acquire()]
+        try:
+            with self.assertRaises(TimeoutError):
+                self.write_parallel(pool_size=3, writers=2,
+                                    pool_timeout=0.05)
+        finally:
+            for connection in connections:
+                pool.release(connection)
+
+    def test_partitioned_read_needs_free_pool_slots(self):
+        def handler(query, params):
+            if query.startswith('SELECT MIN'):
+                return [('min', 3), ('max', 3)], [(0, 24)]
+            return [('test1', 253), ('test2', 3), ('test3', 5)], []
+
+        connection = FakeMysqlConnection(handler)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({'user': 'test'}, pool_size=1) as adapter:
+                with self.assertRaises(ValueError):
+                    adapter.get_partitioned_result_table(
+                        'test_table', 'test2', partitions=2)
+
+
+class TestAdapterMysqlIncremental(unittest.TestCase):
+    def test_get_incremental_table(self):
+        def handler(query, params):
+            return [('test1', 253), ('test2', 3), ('test3', 5)], ROWS[6:]
+
+        connection = FakeMysqlConnection(handler)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                table = adapter.get_incremental_table(
+                    'SELECT * FROM test_table', 'test2', 5, ordered=True)
+                self.assertEqual(list(table.row_iter), ROWS[6:])
+        query, params = connection.statements[0]
+        self.assertEqual(query, 'SELECT * FROM (SELECT * FROM test_table) '
+                                'AS incremental WHERE test2 > %s '
+                                'ORDER BY test2')
+        self.assertEqual(params, (5,))
+
+    def test_append_table(self):
+        connection = FakeMysqlConnection()
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                adapter.append_table(Table(SCHEMA, iter(ROWS)), 'test_writing')
+        self.assertEqual(len(connection.statements), 1)
+        self.assertEqual(connection.inserted, ROWS)
+
+
+class TestAdapterMysqlTypes(unittest.TestCase):
+    def test_get_result_table_typed_columns(self):
+        def handler(query, params):
+            description = [('price', 246), ('day', 10), ('at', 11)]
+            return description, [(decimal.Decimal('1.50'),
+                                  datetime.date(2020, 1, 2),
+                                  datetime.timedelta(hours=3))]
+
+        connection = FakeMysqlConnection(handler)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                table = adapter.get_result_table('SELECT * FROM test_table')
+                self.assertEqual(table.schema, [('price', 'NUMERIC'),
+                                                ('day', 'DATE'),
+                                                ('at', 'STRING')])
+                self.assertEqual(list(table.row_iter),
+                                 [(decimal.Decimal('1.50'),
+                                   datetime.date(2020, 1, 2),
+                                   '03:00:00')])
+
+    def test_time_durations_to_parquet(self):
+        def handler(query, params):
+            return [('at', 11)], [(datetime.timedelta(hours=3),),
+                                  (datetime.timedelta(hours=30),),
+                                  (-datetime.timedelta(minutes=1),)]
+
+        connection = FakeMysqlConnection(handler)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'times.parquet')
+            with mock.patch('mysql.connector.connect',
+                            return_value=connection):
+                with AdapterMysql({}) as source, AdapterParquet() as dest:
+                    transfer(source, 'SELECT * FROM test_table', dest,
+                             file_name)
+                    table = dest.get_result_table(file_name)
+                    self.assertEqual(list(table.row_iter),
+                                     [('03:00:00',), ('30:00:00',),
+                                      ('-00:01:00',)])
+
+    def test_create_table_typed_columns(self):
+        schema = [('flag', 'BOOLEAN'), ('day', 'DATE'), ('other', 'RECORD')]
+        rows = [(True, datetime.date(2020, 1, 2), {'a': 1})]
+        connection = FakeMysqlConnection()
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                adapter.create_table(Table(schema, iter(rows)), 'test_writing')
+        self.assertEqual(connection.statements[0][0],
+                         'CREATE TABLE test_writing '
+                         '(flag BOOLEAN, day DATE, other TEXT)')
+        self.assertEqual(connection.inserted,
+                         [(True, datetime.date(2020, 1, 2), "{'a': 1}")])
+
+
+class TestAdapterMysqlPartitionedRead(unittest.TestCase):
+    def handler(self, query, params):
+        description = [('test1', 253), ('test2', 3), ('test3', 5)]
+        if query.endswith('LIMIT 0'):
+            return description, []
+        if query.startswith('SELECT MIN'):
+            return [('min', 3), ('max', 3)], [(self.low, self.high)]
+        if 'IS NULL' in query:
+            return description, [r for r in self.rows if r[1] < params[0]]
+        if 'AND' in query:
+            return description, [r for r in self.rows
+                                 if params[0] <= r[1] < params[1]]
+        if 'WHERE' in query:
+            return description, [r for r in self.rows if r[1] >= params[0]]
+        return description, self.rows
+
+    def read_partitioned(self, low, high, rows=ROWS, **kwargs):
+        self.low, self.high, self.rows = low, high, rows
+        self.connections = []
+
+        def connect(**db_config):
+            self.connections.append(FakeMysqlConnection(self.handler))
+            return self.connections[-1]
+
+        with mock.patch('mysql.connector.connect', side_effect=connect):
+            with AdapterMysql({}) as adapter:
+                table = adapter.get_partitioned_result_table(
+                    'test_table', 'test2', **kwargs)
+                self.assertEqual(table.schema, SCHEMA)
+                return list(table.row_iter)
+
+    def get_partition_params(self):
+        return [connection.statements[0][1]
+                for connection in self.connections[1:]]
+
+    def test_read_ranges_over_own_connections(self):
+        rows = self.read_partitioned(0, 24, partitions=4, ordered=True)
+        self.assertEqual(rows, ROWS)
+        self.assertEqual(self.get_partition_params(),
+                         [(6,), (6, 12), (12, 18), (18,)])
+        self.assertTrue(all(c.closed for c in self.connections[1:]))
+
+    def test_read_unordered(self):
+        rows = self.read_partitioned(0, 24, partitions=3, fetchsize=4)
+        self.assertEqual(sorted(rows), sorted(ROWS))
+
+    def test_read_date_ranges(self):
+        self.read_partitioned(datetime.date(2020, 1, 1),
+                              datetime.date(2020, 1, 9), rows=[],
+                              partitions=2)
+        self.assertEqual(self.get_partition_params(),
+                         [(datetime.date(2020, 1, 5),),
+                          (datetime.date(2020, 1, 5),)])
+
+    def test_read_empty_table(self):
+        self.read_partitioned(None, None, rows=[])
+        self.assertEqual(self.get_partition_params(), [None])
+
+
+class TestAdapterMysqlParallelWrite(unittest.TestCase):
+    def create_table(self, rows=ROWS, failing_writer=False, **kwargs):
+        self.connections = []
+
+        def connect(**db_config):
+            connection = FakeMysqlConnection()
+            if failing_writer and len(self.connections) == 2:
+                cursor = mock.Mock()
+                cursor.executemany.side_effect = RuntimeError('write failed')
+                connection.cursor = mock.Mock(return_value=cursor)
+            self.connections.append(connection)
+            return connection
+
+        with mock.patch('mysql.connector.connect', side_effect=connect):
+            with AdapterMysql({}) as adapter:
+                adapter.create_table(Table(SCHEMA, iter(rows)),
+                                     'test_writing', **kwargs)
+        return adapter
+
+    def test_create_table_parallel_writers(self):
+        adapter = self.create_table(chunksize=5, writers=3)
+        main, writers = self.connections[0], self.connections[1:]
+        self.assertEqual(len(writers), 3)
+        self.assertEqual(main.inserted, [])
+        self.assertEqual(sorted(row for w in writers for row in w.inserted),
+                         sorted(ROWS))
+        self.assertEqual(sum(w.commits for w in writers), 5 + 3)
+        self.assertTrue(all(w.closed for w in writers))
+        self.assertGreater(adapter.rows_per_second, 0)
+
+    def test_create_table_parallel_merges_source_batches(self):
+        batches = [tuple(map(list, zip(*ROWS[i:i + 5])))
+                   for i in range(0, 25, 5)]
+        self.connections = []
+
+        def connect(**db_config):
+            self.connections.append(FakeMysqlConnection())
+            return self.connections[-1]
+
+        with mock.patch('mysql.connector.connect', side_effect=connect):
+            with AdapterMysql({}) as adapter:
+                adapter.create_table(Table.from_batches(SCHEMA, iter(batches)),
+                                     'test_writing', chunksize=25, writers=2)
+        inserts = [statement for c in self.connections[1:]
+                   for statement in c.statements]
+        self.assertEqual(len(inserts), 1)
+
+    def test_create_table_parallel_commit_every(self):
+        self.create_table(chunksize=5, writers=1, commit_every=2)
+        self.assertEqual(self.connections[1].commits, 3)
+
+    def test_create_table_parallel_writer_error(self):
+        rows = [(f'value{i}', i, i * 1.1) for i in range(500)]
+        with self.assertRaises(RuntimeError):
+            self.create_table(rows, failing_writer=True, chunksize=5,
+                              writers=2)
+
+    def test_create_table_indexes_after_load(self):
+        self.create_table(indexes=['test2', ('test1', 'test3')])
+        statements = [query for query, _ in self.connections[0].statements]
+        self.assertTrue(statements[1].startswith('INSERT INTO'))
+        self.assertEqual(statements[-1],
+                         'ALTER TABLE test_writing ADD INDEX idx_test2 '
+                         '(test2), ADD INDEX idx_test1_test3 (test1, test3)')
+
+
+class TestAdapterMysqlMetrics(unittest.TestCase):
+    def test_metrics(self):
+        def handler(query, params):
+            return [('test1', 253), ('test2', 3), ('test3', 5)], ROWS
+
+        connection = FakeMysqlConnection(handler)
+        with mock.patch('mysql.connector.connect', return_value=connection):
+            with AdapterMysql({}) as adapter:
+                list(adapter.get_result_table('SELECT * FROM test_table',
+                                              fetchsize=10).row_iter)
+                adapter.append_table(Table(SCHEMA, iter(ROWS)),
+                                     'test_writing', chunksize=10)
+        snapshot = adapter.metrics.snapshot()
+        self.assertEqual(snapshot['rows_read'],
+                         {'count': 3, 'total': 25, 'max': 10})
+        self.assertEqual(snapshot['rows_written']['total'], 25)
+        self.assertEqual(snapshot['round_trips']['total'],
+                         connection.round_trips + connection.commits)
+        self.assertEqual(snapshot['query_seconds']['count'], 1)
+        self.assertEqual(snapshot['fetch_seconds']['count'], 4)
+        self.assertEqual(snapshot['write_seconds']['count'], 3)
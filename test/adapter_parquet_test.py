@@ -0,0 +1,148 @@
+import datetime
+import decimal
+import os
+import tempfile
+import unittest
+import pyarrow
+import pyarrow.parquet
+from adapters.adapter_abstract import Table
+from adapters.adapter_parquet import AdapterParquet
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER'), ('test3', 'FLOAT')]
+ROWS = [(f'value{i}', i, i * 1.5) for i in range(25)]
+
+
+class TestAdapterParquet(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.temp_dir.name, 'temp.parquet')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_table(self, schema=SCHEMA, rows=ROWS, **kwargs):
+        with AdapterParquet() as adapter:
+            adapter.create_table(Table(schema, iter(rows)), self.file_name,
+                                 **kwargs)
+
+    def read_table(self, **kwargs):
+        with AdapterParquet() as adapter:
+            table = adapter.get_result_table(self.file_name, **kwargs)
+            return table.schema, list(table.row_iter), adapter.metrics
+
+    def test_create_table_row_groups(self):
+        self.create_table(row_group_size=10)
+        metadata = pyarrow.parquet.ParquetFile(self.file_name).metadata
+        self.assertEqual(metadata.num_row_groups, 3)
+        schema, rows, _ = self.read_table(batchsize=4)
+        self.assertEqual(schema, SCHEMA)
+        self.assertEqual(rows, ROWS)
+
+    def test_create_table_merges_source_batches(self):
+        batches = [tuple(map(list, zip(*ROWS[i:i + 5])))
+                   for i in range(0, 25, 5)]
+        with AdapterParquet() as adapter:
+            adapter.create_table(Table.from_batches(SCHEMA, iter(batches)),
+                                 self.file_name, row_group_size=25)
+        metadata = pyarrow.parquet.ParquetFile(self.file_name).metadata
+        self.assertEqual(metadata.num_row_groups, 1)
+        self.assertEqual(self.read_table()[1], ROWS)
+
+    def test_typed_columns_roundtrip(self):
+        schema = [('flag', 'BOOLEAN'), ('price', 'NUMERIC'), ('day', 'DATE'),
+                  ('at', 'DATETIME'), ('time', 'TIME'), ('other', 'RECORD')]
+        rows = [(True, decimal.Decimal('1.10'), datetime.date(2020, 1, 2),
+                 datetime.datetime(2020, 1, 2, 3, 4, 5), datetime.time(6, 7),
+                 {'a': 1}),
+                (None, None, None, None, None, None)]
+        self.create_table(schema, rows)
+        schema, rows, _ = self.read_table()
+        self.assertEqual(schema[-1], ('other', 'STRING'))
+        self.assertEqual(rows[0][:5], (
+            True, decimal.Decimal('1.100000000'), datetime.date(2020, 1, 2),
+            datetime.datetime(2020, 1, 2, 3, 4, 5), datetime.time(6, 7)))
+        self.assertEqual(rows[0][5], "{'a': 1}")
+        self.assertEqual(rows[1], (None,) * 6)
+
+    def test_column_projection(self):
+        self.create_table()
+        _, _, full_metrics = self.read_table()
+        schema, rows, metrics = self.read_table(columns=['test3', 'test1'])
+        self.assertEqual(schema, [('test3', 'FLOAT'), ('test1', 'STRING')])
+        self.assertEqual(rows, [(i * 1.5, f'value{i}') for i in range(25)])
+        self.assertLess(metrics.get_total('bytes_read'),
+                        full_metrics.get_total('bytes_read'))
+
+    def test_filters_skip_row_groups(self):
+        self.create_table(row_group_size=10)
+        schema, rows, metrics = self.read_table(
+            columns=['test1'], filters=[('test2', '>=', 18),
+                                        ('test3', '<', 33)])
+        self.assertEqual(schema, [('test1', 'STRING')])
+        self.assertEqual(rows, [(f'value{i}',) for i in range(18, 22)])
+        _, _, unpruned_metrics = self.read_table(
+            columns=['test1'], filters=[('test2', '>=', 0),
+                                        ('test3', '<', 33)])
+        self.assertLess(metrics.get_total('bytes_read'),
+                        unpruned_metrics.get_total('bytes_read'))
+
+    def test_filters_in(self):
+        self.create_table(row_group_size=10)
+        _, rows, metrics = self.read_table(filters=[('test2', 'in', [3, 4])])
+        self.assertEqual(rows, ROWS[3:5])
+        _, _, full_metrics = self.read_table()
+        self.assertLess(metrics.get_total('bytes_read'),
+                        full_metrics.get_total('bytes_read') / 2)
+
+    def test_filters_match_nothing(self):
+        self.create_table()
+        _, rows, _ = self.read_table(filters=[('test2', '>', 100)])
+        self.assertEqual(rows, [])
+
+    def test_unknown_filter_operator(self):
+        self.create_table()
+        with AdapterParquet() as adapter:
+            with self.assertRaises(ValueError):
+                adapter.get_result_table(self.file_name,
+                                         filters=[('test2', '~', 1)])
+
+    def test_schema_without_metadata(self):
+        pyarrow.parquet.write_table(pyarrow.table({
+            'a': pyarrow.array([1], pyarrow.int32()),
+            'b': pyarrow.array([datetime.date(2020, 1, 1)]),
+            'c': pyarrow.array(['x'])}), self.file_name)
+        schema, rows, _ = self.read_table()
+        self.assertEqual(schema, [('a', 'INTEGER'), ('b', 'DATE'),
+                                  ('c', 'STRING')])
+        self.assertEqual(rows, [(1, datetime.date(2020, 1, 1), 'x')])
+
+    def test_append_table(self):
+        self.create_table(rows=ROWS[:10], row_group_size=10)
+        with AdapterParquet() as adapter:
+            adapter.append_table(Table(SCHEMA, iter(ROWS[10:])),
+                                 self.file_name, row_group_size=10)
+        metadata = pyarrow.parquet.ParquetFile(self.file_name).metadata
+        self.assertEqual(metadata.num_row_groups, 3)
+        schema, rows, _ = self.read_table()
+        self.assertEqual(schema, SCHEMA)
+        self.assertEqual(rows, ROWS)
+        self.assertEqual(os.listdir(self.temp_dir.name), ['temp.parquet'])
+
+    def test_append_table_converts_to_file_schema(self):
+        self.create_table([('a', 'FLOAT')], [(1.5,)])
+        with AdapterParquet() as adapter:
+            adapter.append_table(Table([('a', 'INTEGER')], iter([(2,)])),
+                                 self.file_name)
+        schema, rows, _ = self.read_table()
+        self.assertEqual(schema, [('a', 'FLOAT')])
+        self.assertEqual(rows, [(1.5,), (2.0,)])
+
+    def test_delete_table(self):
+        self.create_table()
+        with AdapterParquet() as adapter:
+            adapter.delete_table(self.file_name)
+        self.assertFalse(os.path.exists(self.file_name))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+from fakes import FakeMysqlConnection
+from adapters.connection_pool import ConnectionPool
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.connections = []
+
+    def tearDown(self):
+        ConnectionPool.close_all()
+
+    def connect(self):
+        connection = FakeMysqlConnection()
+        self.connections.append(connection)
+        return connection
+
+    def test_reuses_released_connection(self):
+        pool = ConnectionPool(self.connect, size=2)
+        connection = pool.acquire()
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+        self.assertEqual(len(self.connections), 1)
+
+    def test_size_limits_borrowed_connections(self):
+        pool = ConnectionPool(self.connect, size=1)
+        connection = pool.acquire()
+        with self.assertRaises(TimeoutError):
+            pool.acquire(timeout=0.01)
+        threading.Timer(0.02, pool.release, [connection]).start()
+        self.assertIs(pool.acquire(timeout=1), connection)
+
+    def test_replaces_unhealthy_connection(self):
+        pool = ConnectionPool(self.connect, size=1)
+        connection = pool.acquire()
+        pool.release(connection)
+        connection.closed = True
+        self.assertIsNot(pool.acquire(), connection)
+
+    def test_evicts_idle_connections(self):
+        pool = ConnectionPool(self.connect, size=1, idle_timeout=0.01)
+        connection = pool.acquire()
+        pool.release(connection)
+        time.sleep(0.02)
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.closed)
+
+    def test_get_pool_is_shared_per_config(self):
+        pool = ConnectionPool.get_pool({'user': 'a'}, self.connect)
+        self.assertIs(ConnectionPool.get_pool({'user': 'a'}, self.connect),
+                      pool)
+        self.assertIsNot(ConnectionPool.get_pool({'user': 'b'}, self.connect),
+                         pool)
+
+    def test_get_pool_rejects_other_settings(self):
+        ConnectionPool.get_pool({'user': 'a'}, self.connect, size=2)
+        with self.assertRaises(ValueError):
+            ConnectionPool.get_pool({'user': 'a'}, self.connect, size=10)
+        with self.assertRaises(ValueError):
+            ConnectionPool.get_pool({'user': 'a'}, self.connect, size=2,
+                                    idle_timeout=60)
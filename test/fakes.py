@@ -0,0 +1,288 @@
+import time
+
+
+class FakeMysqlCursor:
+    """Unbuffered cursors leave the result unread on the connection until
+    its last row was fetched, buffered cursors fetch it on execute."""
+
+    def __init__(self, connection, buffered=False):
+        self.connection = connection
+        self.buffered = buffered
+        self.description = None
+        self.closed = False
+        self.__rows = iter(())
+
+    def execute(self, query, params=None):
+        self.connection.check_unread_result()
+        self.connection.statements.append((query, params))
+        description, rows = self.connection.handler(query, params)
+        self.description = description
+        if self.buffered:
+            rows = list(rows)
+        self.__rows = iter(rows)
+        self.connection.unread_result = (
+            description is not None and not self.buffered)
+
+    def executemany(self, query, seq_params):
+        self.connection.check_unread_result()
+        seq_params = list(seq_params)
+        self.connection.statements.append((query, seq_params))
+        self.connection.inserted.extend(seq_params)
+
+    def fetchmany(self, size=1):
+        self.connection.fetches += 1
+        rows = [row for _, row in zip(range(size), self.__rows)]
+        if len(rows) < size:
+            self.__read_all()
+        return rows
+
+    def fetchall(self):
+        self.connection.fetches += 1
+        rows = list(self.__rows)
+        self.__read_all()
+        return rows
+
+    def __read_all(self):
+        if not self.buffered:
+            self.connection.unread_result = False
+
+    def close(self):
+        if not self.buffered:
+            self.connection.check_unread_result()
+        self.closed = True
+
+
+class FakeMysqlConnection:
+    """In-process stand-in for a mysql.connector connection.
+
+    Every execute/executemany call is counted as one round trip.
+    """
+
+    def __init__(self, handler=None, buffered=False):
+        self.handler = handler or (lambda query, params: (None, []))
+        self.buffered = buffered
+        self.unread_result = False
+        self.statements = []
+        self.inserted = []
+        self.commits = 0
+        self.fetches = 0
+        self.cursors = []
+        self.closed = False
+
+    def cursor(self, **kwargs):
+        cursor = FakeMysqlCursor(self, kwargs.get('buffered', self.buffered))
+        self.cursors.append((cursor, kwargs))
+        return cursor
+
+    def check_unread_result(self):
+        if self.unread_result:
+            from mysql.connector.errors import InternalError
+            raise InternalError('Unread result found')
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def round_trips(self):
+        return len(self.statements)
+
+
+class FakeBigqueryJob:
+    def __init__(self, result=None):
+        self.__result = result
+
+    def result(self):
+        return self.__result
+
+
+class FakeBigqueryRow:
+    def __init__(self, values):
+        self.__values = tuple(values)
+
+    def values(self):
+        return self.__values
+
+
+class FakeBigqueryRowIterator:
+    def __init__(self, schema, rows, page_size=10):
+        from google.cloud import bigquery
+        self.schema = [bigquery.SchemaField(*column) for column in schema]
+        self.rows = rows
+        self.page_size = page_size
+
+    def __iter__(self):
+        return (FakeBigqueryRow(row) for row in self.rows)
+
+    @property
+    def pages(self):
+        for start in range(0, len(self.rows), self.page_size):
+            page = self.rows[start:start + self.page_size]
+            yield [FakeBigqueryRow(row) for row in page]
+
+
+class FakeBigqueryQueryJob:
+    def __init__(self, destination, result):
+        self.destination = destination
+        self.__result = result
+
+    def result(self):
+        return self.__result
+
+
+class FakeBigqueryClient:
+    """In-process stand-in for a google.cloud.bigquery client.
+
+    Every query returns the rows given for `schema` from a table named
+    `_anon.query_result`.
+    """
+
+    def __init__(self, project='fake-project', schema=(), rows=(),
+                 page_size=10):
+        self.project = project
+        self.schema = list(schema)
+        self.rows = list(rows)
+        self.page_size = page_size
+        self.queries = []
+        self.tables = {}
+        self.inserted = []
+        self.loads = []
+
+    def query(self, query, job_config=None):
+        self.queries.append((query, job_config))
+        destination = self.dataset('_anon').table('query_result')
+        result = FakeBigqueryRowIterator(
+            self.schema, self.rows, self.page_size)
+        return FakeBigqueryQueryJob(destination, result)
+
+    def dataset(self, dataset_id):
+        from google.cloud import bigquery
+        return bigquery.DatasetReference(self.project, dataset_id)
+
+    def create_table(self, table):
+        self.tables[table.table_id] = table
+        return table
+
+    def get_table(self, table_ref):
+        return self.tables[table_ref.table_id]
+
+    def delete_table(self, table_ref):
+        del self.tables[table_ref.table_id]
+
+    def insert_rows(self, table, rows):
+        self.inserted.extend(rows)
+        return []
+
+    def load_table_from_file(self, file_obj, destination, job_config=None):
+        self.loads.append((file_obj.read(), job_config))
+        return FakeBigqueryJob()
+
+
+class FakeReadRowsIterable:
+    def __init__(self, pages):
+        self.pages = [[dict(row) for row in page] for page in pages]
+
+
+class FakeReadRowsStream:
+    def __init__(self, pages, delay):
+        self.__pages = pages
+        self.__delay = delay
+
+    def rows(self, session):
+        time.sleep(self.__delay)
+        return FakeReadRowsIterable(self.__pages)
+
+
+class FakeReadStream:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeReadSession:
+    def __init__(self, stream_names):
+        self.streams = [FakeReadStream(name) for name in stream_names]
+
+
+class FakeBigqueryReadClient:
+    """In-process stand-in for a BigQuery Storage read client.
+
+    `streams` is a list of streams, each a list of pages of dict rows.
+    """
+
+    def __init__(self, streams, delay=0):
+        self.streams = streams
+        self.delay = delay
+        self.sessions = []
+
+    def create_read_session(self, parent, read_session, max_stream_count):
+        self.sessions.append((parent, read_session, max_stream_count))
+        stream_count = min(max_stream_count, len(self.streams))
+        return FakeReadSession([str(i) for i in range(stream_count)])
+
+    def read_rows(self, stream_name):
+        pages = self.streams[int(stream_name)]
+        return FakeReadRowsStream(pages, self.delay)
+
+
+class FakeAiomysqlCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.__rows = iter(())
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exception):
+        await self.close()
+
+    async def execute(self, query, params=None):
+        self.connection.statements.append((query, params))
+        description, rows = self.connection.handler(query, params)
+        self.description = description
+        self.__rows = iter(rows)
+
+    async def executemany(self, query, seq_params):
+        seq_params = list(seq_params)
+        self.connection.statements.append((query, seq_params))
+        self.connection.inserted.extend(seq_params)
+
+    async def fetchmany(self, size=1):
+        return [row for _, row in zip(range(size), self.__rows)]
+
+    async def close(self):
+        pass
+
+
+class FakeAiomysqlConnection(FakeMysqlConnection):
+    """In-process stand-in for an aiomysql connection."""
+
+    def cursor(self, *cursor_class):
+        return _FakeAwaitableCursor(FakeAiomysqlCursor(self))
+
+    async def commit(self):
+        self.commits += 1
+
+
+class _FakeAwaitableCursor:
+    # aiomysql's connection.cursor() can be awaited or used with async with
+    def __init__(self, cursor):
+        self.__cursor = cursor
+
+    def __await__(self):
+        yield from ()
+        return self.__cursor
+
+    async def __aenter__(self):
+        return self.__cursor
+
+    async def __aexit__(self, *exception):
+        await self.__cursor.close()
@@ -0,0 +1,72 @@
+import logging
+import os
+import tempfile
+import unittest
+from adapters.adapter_abstract import Table
+from adapters.adapter_csv import AdapterCsv
+from adapters.metrics import Metrics
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER')]
+ROWS = [(f'value{i}', i) for i in range(25)]
+
+
+class TestMetrics(unittest.TestCase):
+    def test_record_and_snapshot(self):
+        metrics = Metrics()
+        metrics.record('rows_read', 10)
+        metrics.record('rows_read', 5)
+        self.assertEqual(metrics.snapshot(),
+                         {'rows_read': {'count': 2, 'total': 15, 'max': 10}})
+        self.assertEqual(metrics.get_total('rows_read'), 15)
+        metrics.reset()
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_hooks(self):
+        metrics = Metrics()
+        recorded = []
+        metrics.add_hook(lambda name, value: recorded.append((name, value)))
+        with metrics.timer('query'):
+            pass
+        batches = [(['a', 'b'],), (['c'],)]
+        self.assertEqual(list(metrics.counted(batches, 'rows_read')), batches)
+        self.assertEqual([name for name, _ in recorded],
+                         ['query_seconds', 'rows_read', 'rows_read'])
+        self.assertEqual(metrics.get_total('rows_read'), 3)
+
+    def test_timed_records_each_item(self):
+        metrics = Metrics()
+        self.assertEqual(list(metrics.timed(iter([1, 2, 3]), 'fetch')),
+                         [1, 2, 3])
+        self.assertEqual(metrics.snapshot()['fetch_seconds']['count'], 3)
+
+
+class TestAdapterMetrics(unittest.TestCase):
+    def test_csv_adapter_records_reads_and_writes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            file_name = os.path.join(temp_dir, 'temp.csv')
+            with AdapterCsv() as adapter:
+                adapter.create_table(Table(SCHEMA, iter(ROWS)), file_name,
+                                     chunksize=10)
+                list(adapter.get_result_table(file_name, chunksize=10).row_iter)
+                file_size = os.path.getsize(file_name)
+        snapshot = adapter.metrics.snapshot()
+        self.assertEqual(snapshot['rows_written'],
+                         {'count': 3, 'total': 25, 'max': 10})
+        self.assertEqual(snapshot['rows_read']['total'], 25)
+        self.assertEqual(snapshot['bytes_read']['total'], file_size)
+        self.assertEqual(snapshot['bytes_written']['total'], file_size)
+        for name in ('write_seconds', 'fetch_seconds', 'convert_seconds'):
+            self.assertIn(name, snapshot)
+
+    def test_logger_handler_added_once(self):
+        AdapterCsv()
+        handlers = list(logging.getLogger('adapters.adapter_abstract').handlers)
+        AdapterCsv()
+        AdapterCsv()
+        self.assertEqual(
+            logging.getLogger('adapters.adapter_abstract').handlers, handlers)
+        self.assertEqual(len(handlers), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import threading
+import time
+import unittest
+from adapters.streams import fan_in
+
+
+def get_stream(name, size, delay=0):
+    def stream():
+        for i in range(size):
+            time.sleep(delay)
+            yield (name, i)
+    return stream
+
+
+class TestFanIn(unittest.TestCase):
+    def test_ordered(self):
+        streams = [get_stream('a', 3, 0.01), get_stream('b', 2), get_stream('c', 0)]
+        items = list(fan_in(streams, max_workers=2, prefetch=1))
+        self.assertEqual(items, [('a', 0), ('a', 1), ('a', 2),
+                                 ('b', 0), ('b', 1)])
+
+    def test_unordered(self):
+        streams = [get_stream('a', 3, 0.05), get_stream('b', 3)]
+        items = list(fan_in(streams, ordered=False))
+        self.assertEqual(sorted(items), [('a', 0), ('a', 1), ('a', 2),
+                                         ('b', 0), ('b', 1), ('b', 2)])
+        self.assertEqual(items[0], ('b', 0))
+
+    def test_reads_streams_concurrently(self):
+        streams = [get_stream(name, 5, 0.02) for name in 'abcd']
+        start = time.perf_counter()
+        items = list(fan_in(streams, max_workers=4, prefetch=5))
+        self.assertEqual(len(items), 20)
+        self.assertLess(time.perf_counter() - start, 0.3)
+
+    def test_raises_stream_error(self):
+        def failing_stream():
+            yield 1
+            raise ValueError('page failed')
+        with self.assertRaises(ValueError):
+            list(fan_in([get_stream('a', 2), failing_stream]))
+
+    def test_close_stops_readers(self):
+        threads_before = threading.active_count()
+        items = fan_in([get_stream('a', 1000), get_stream('b', 1000)],
+                       prefetch=1)
+        next(items)
+        items.close()
+        self.assertEqual(threading.active_count(), threads_before)
@@ -0,0 +1,70 @@
+import datetime
+import os
+import tempfile
+import unittest
+from adapters.adapter_abstract import Table
+from adapters.adapter_csv import AdapterCsv
+from adapters.state import decode_watermark, encode_watermark
+from adapters.sync import sync
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER'), ('test3', 'FLOAT')]
+ROWS = [(f'value{i}', i, i * 1.5) for i in range(10)]
+NEW_ROWS = [(f'value{i}', i, i * 1.5) for i in range(10, 15)]
+
+
+class TestSync(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_name = os.path.join(self.temp_dir.name, 'source.csv')
+        self.dest_name = os.path.join(self.temp_dir.name, 'dest.csv')
+        self.state_file = os.path.join(self.temp_dir.name, 'state.json')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def sync(self):
+        with AdapterCsv() as source, AdapterCsv() as dest:
+            return sync(source, self.source_name, dest, self.dest_name,
+                        'test2', self.state_file)
+
+    def read_dest(self):
+        with AdapterCsv() as adapter:
+            return list(adapter.get_result_table(self.dest_name).row_iter)
+
+    def test_sync_appends_only_new_rows(self):
+        with AdapterCsv() as adapter:
+            adapter.create_table(Table(SCHEMA, iter(ROWS)), self.source_name)
+            self.assertEqual(self.sync(), (10, 9))
+            self.assertEqual(self.read_dest(), ROWS)
+            adapter.append_table(Table(SCHEMA, iter(NEW_ROWS)),
+                                 self.source_name)
+        self.assertEqual(self.sync(), (5, 14))
+        self.assertEqual(self.sync(), (0, 14))
+        self.assertEqual(self.read_dest(), ROWS + NEW_ROWS)
+
+    def test_sync_empty_source_creates_table_once(self):
+        with AdapterCsv() as adapter:
+            adapter.create_table(Table(SCHEMA, iter([])), self.source_name)
+        self.assertEqual(self.sync(), (0, None))
+        self.assertEqual(self.sync(), (0, None))
+        self.assertEqual(self.read_dest(), [])
+
+    def test_sync_passes_kwargs(self):
+        with AdapterCsv() as source, AdapterCsv() as dest:
+            source.create_table(Table(SCHEMA, iter(ROWS)), self.source_name)
+            for new_rows in ([], NEW_ROWS):
+                source.append_table(Table(SCHEMA, iter(new_rows)),
+                                    self.source_name)
+                sync(source, self.source_name, dest, self.dest_name, 'test2',
+                     self.state_file, read_kwargs={'engine': 'mmap'},
+                     write_kwargs={'compression': 'gzip'})
+            with open(self.dest_name, 'rb') as f:
+                self.assertEqual(f.read(2), b'\x1f\x8b')
+            table = dest.get_result_table(self.dest_name, compression='gzip')
+            self.assertEqual(list(table.row_iter), ROWS + NEW_ROWS)
+
+    def test_watermark_encoding(self):
+        for watermark in [3, 'b', datetime.date(2019, 8, 8),
+                          datetime.datetime(2019, 8, 8, 12, 30)]:
+            encoded = encode_watermark(watermark)
+            self.assertEqual(decode_watermark(encoded), watermark)
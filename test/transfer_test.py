@@ -0,0 +1,198 @@
+import itertools
+import json
+import os
+import tempfile
+import time
+import unittest
+from adapters.adapter_abstract import AdapterAbstract, Table
+from adapters.adapter_parquet import AdapterParquet
+from adapters.transfer import resumable_transfer, transfer
+
+SCHEMA = [('test1', 'STRING'), ('test2', 'INTEGER')]
+ROWS = [(f'value{i}', i) for i in range(100)]
+
+
+class SlowSource(AdapterAbstract):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+        self.watermarks = []
+
+    def get_result_table(self, query, limit=None):
+        return Table(SCHEMA, itertools.islice(self.__get_row_iter(), limit))
+
+    def get_incremental_table(self, query, column, watermark, ordered=False,
+                              **kwargs):
+        self.watermarks.append(watermark)
+        return super().get_incremental_table(query, column, watermark,
+                                             ordered, **kwargs)
+
+    def __get_row_iter(self):
+        for i, row in enumerate(ROWS):
+            if i % 10 == 0:
+                time.sleep(self.delay)
+            yield row
+
+    def create_table(self, table, table_adress):
+        pass
+
+    def delete_table(self, table_adress):
+        pass
+
+
+class SlowDestination(AdapterAbstract):
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+        self.tables = {}
+
+    def get_result_table(self, table_adress):
+        return Table(SCHEMA, iter(self.tables[table_adress]))
+
+    def create_table(self, table, table_adress, chunksize=10):
+        self.chunksize = chunksize
+        rows = self.tables[table_adress] = []
+        for batch in table.batch_iter(chunksize):
+            time.sleep(self.delay)
+            rows.extend(zip(*batch))
+
+    def delete_table(self, table_adress):
+        del self.tables[table_adress]
+
+
+class FailingDestination(SlowDestination):
+    def __init__(self, tables=None, fail_after=None):
+        super().__init__(0)
+        self.tables = tables if tables is not None else {}
+        self.fail_after = fail_after
+        self.appends = 0
+
+    def append_table(self, table, table_adress, chunksize=10):
+        if self.appends == self.fail_after:
+            raise ConnectionError('connection lost')
+        self.appends += 1
+        self.chunksize = chunksize
+        for batch in table.batch_iter(chunksize):
+            self.tables[table_adress].extend(zip(*batch))
+
+
+class TestTransfer(unittest.TestCase):
+    def test_transfer(self):
+        dest = SlowDestination(0)
+        stats = transfer(SlowSource(0), 'query', dest, 'table', batchsize=10)
+        self.assertEqual(dest.tables['table'], ROWS)
+        self.assertEqual(stats.rows, 100)
+        self.assertEqual(stats.batches, 10)
+
+    def test_transfer_passes_kwargs(self):
+        dest = SlowDestination(0)
+        transfer(SlowSource(0), 'query', dest, 'table',
+                 read_kwargs={'limit': 30}, write_kwargs={'chunksize': 20})
+        self.assertEqual(dest.tables['table'], ROWS[:30])
+        self.assertEqual(dest.chunksize, 20)
+
+    def test_transfer_overlaps_read_and_write(self):
+        dest = SlowDestination(0.02)
+        stats = transfer(SlowSource(0.02), 'query', dest, 'table',
+                         queue_size=2, batchsize=10)
+        self.assertEqual(dest.tables['table'], ROWS)
+        self.assertGreater(stats.read_seconds, 0.18)
+        self.assertGreater(stats.write_seconds, 0.18)
+        self.assertLess(stats.wall_seconds,
+                        0.8 * (stats.read_seconds + stats.write_seconds))
+
+
+class TestResumableTransfer(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.checkpoint_file = os.path.join(temp_dir.name, 'checkpoint.json')
+
+    def test_resumable_transfer(self):
+        dest = FailingDestination()
+        stats = resumable_transfer(
+            SlowSource(0), 'query', dest, 'table', self.checkpoint_file,
+            checkpoint_rows=30, batchsize=10)
+        self.assertEqual(dest.tables['table'], ROWS)
+        self.assertEqual(stats.rows, 100)
+        self.assertEqual(dest.appends, 4)
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+
+    def test_resume_after_key(self):
+        dest = FailingDestination(fail_after=2)
+        with self.assertRaises(ConnectionError):
+            resumable_transfer(
+                SlowSource(0), 'query', dest, 'table', self.checkpoint_file,
+                key_column='test2', checkpoint_rows=30, batchsize=10)
+        with open(self.checkpoint_file) as f:
+            self.assertEqual(json.load(f)['rows'], 60)
+        source = SlowSource(0)
+        stats = resumable_transfer(
+            source, 'query', FailingDestination(dest.tables), 'table',
+            self.checkpoint_file, key_column='test2', checkpoint_rows=30,
+            batchsize=10)
+        self.assertEqual(source.watermarks, [59])
+        self.assertEqual(stats.rows, 40)
+        self.assertEqual(dest.tables['table'], ROWS)
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+
+    def test_resume_after_offset(self):
+        dest = FailingDestination(fail_after=1)
+        with self.assertRaises(ConnectionError):
+            resumable_transfer(
+                SlowSource(0), 'query', dest, 'table', self.checkpoint_file,
+                checkpoint_rows=25, batchsize=10)
+        stats = resumable_transfer(
+            SlowSource(0), 'query', FailingDestination(dest.tables), 'table',
+            self.checkpoint_file, checkpoint_rows=25, batchsize=10)
+        self.assertEqual(stats.rows, 70)
+        self.assertEqual(dest.tables['table'], ROWS)
+
+    def test_checkpoint_of_other_transfer(self):
+        dest = FailingDestination(fail_after=0)
+        with self.assertRaises(ConnectionError):
+            resumable_transfer(SlowSource(0), 'query', dest, 'table',
+                               self.checkpoint_file)
+        with self.assertRaises(ValueError):
+            resumable_transfer(SlowSource(0), 'other query', dest, 'table',
+                               self.checkpoint_file)
+
+    def test_destination_without_append(self):
+        dest = SlowDestination(0)
+        with self.assertRaises(NotImplementedError):
+            resumable_transfer(SlowSource(0), 'query', dest, 'table',
+                               self.checkpoint_file)
+        self.assertEqual(dest.tables, {})
+        self.assertFalse(os.path.exists(self.checkpoint_file))
+
+    def test_resumable_transfer_to_parquet(self):
+        file_name = os.path.join(os.path.dirname(self.checkpoint_file),
+                                 'dest.parquet')
+        with AdapterParquet() as dest:
+            resumable_transfer(SlowSource(0), 'query', dest, file_name,
+                               self.checkpoint_file, checkpoint_rows=30,
+                               batchsize=10)
+            self.assertEqual(list(dest.get_result_table(file_name).row_iter),
+                             ROWS)
+
+    def test_unstable_source_needs_key_column(self):
+        source = SlowSource(0)
+        source.has_stable_order = lambda: False
+        dest = FailingDestination()
+        with self.assertRaises(ValueError):
+            resumable_transfer(source, 'query', dest, 'table',
+                               self.checkpoint_file)
+        self.assertEqual(dest.tables, {})
+        resumable_transfer(source, 'query', dest, 'table',
+                           self.checkpoint_file, key_column='test2')
+        self.assertEqual(dest.tables['table'], ROWS)
+
+    def test_resumable_transfer_passes_kwargs(self):
+        dest = FailingDestination()
+        resumable_transfer(SlowSource(0), 'query', dest, 'table',
+                           self.checkpoint_file, key_column='test2',
+                           read_kwargs={'limit': 30},
+                           write_kwargs={'chunksize': 5})
+        self.assertEqual(dest.tables['table'], ROWS[:30])
+        self.assertEqual(dest.chunksize, 5)
@@ -0,0 +1,62 @@
+import datetime
+import decimal
+import unittest
+from adapters.adapter_abstract import Table
+from adapters.type_mapping import (compile_plan, compile_text_plan,
+                                   convert_table, get_supported_schema,
+                                   format_duration, parse_text_batch)
+
+
+class TestTypeMapping(unittest.TestCase):
+    def test_compile_plan_skips_matching_columns(self):
+        plan = compile_plan(
+            [('a', 'STRING'), ('b', 'INTEGER'), ('c', 'DATETIME')],
+            [('a', 'STRING'), ('b', 'FLOAT'), ('c', 'TIMESTAMP')])
+        self.assertEqual(plan, [None, float, None])
+
+    def test_compile_plan_unknown_conversion(self):
+        with self.assertRaises(ValueError):
+            compile_plan([('a', 'DATE')], [('a', 'INTEGER')])
+
+    def test_parse_text_batch(self):
+        schema = [('a', 'STRING'), ('b', 'INTEGER'), ('c', 'BOOLEAN'),
+                  ('d', 'NUMERIC'), ('e', 'DATE')]
+        batch = (['x', ''], ['1', ''], ['true', 'f'], ['1.10', '2'],
+                 ['2020-01-02', ''])
+        self.assertEqual(
+            parse_text_batch(batch, compile_text_plan(schema)),
+            (['x', ''], [1, None], [True, False],
+             [decimal.Decimal('1.10'), decimal.Decimal('2')],
+             [datetime.date(2020, 1, 2), None]))
+
+    def test_parse_text_batch_invalid_value(self):
+        with self.assertRaises(ValueError):
+            parse_text_batch((['1', 'x'],), compile_text_plan([('a', 'INTEGER')]))
+
+    def test_convert_table(self):
+        table = Table([('a', 'INTEGER'), ('b', 'DATE')],
+                      iter([(1, datetime.date(2020, 1, 2)), (None, None)]))
+        dest_schema = get_supported_schema(table.schema, {'INTEGER', 'FLOAT'})
+        table = convert_table(table, dest_schema)
+        self.assertEqual(table.schema, [('a', 'INTEGER'), ('b', 'STRING')])
+        self.assertEqual(list(table.row_iter),
+                         [(1, '2020-01-02'), (None, None)])
+
+    def test_convert_table_without_conversion(self):
+        rows = iter([(1,)])
+        table = convert_table(Table([('a', 'INTEGER')], rows), [('a', 'INTEGER')])
+        self.assertIs(table.row_iter, rows)
+
+    def test_format_duration(self):
+        self.assertEqual(format_duration(
+            datetime.timedelta(hours=1, seconds=2)), '01:00:02')
+        self.assertEqual(format_duration(datetime.timedelta(hours=25)),
+                         '25:00:00')
+        self.assertEqual(format_duration(-datetime.timedelta(
+            hours=838, minutes=59, seconds=59)), '-838:59:59')
+        self.assertEqual(format_duration(-datetime.timedelta(
+            microseconds=500)), '-00:00:00.000500')
+
+
+if __name__ == '__main__':
+    unittest.main()